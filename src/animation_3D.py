@@ -2,17 +2,29 @@ import numpy as np
 from matplotlib.animation import FuncAnimation
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
-from astropy.time import Time, TimeDelta
-from global_consts import INTERVAL, FRAME_NUM, VECTORS_NUM, date, delta_t, AU_IN_METERS
+from decimation import polyline_indices, decimate
+from global_consts import INTERVAL, FRAME_NUM, RELATIVE_FRAME_STEP, date, delta_t, AU_IN_METERS
+
+def _pixel_width(fig, ax):
+    """Ширина области осей в пикселях - целевое число точек после прореживания."""
+    return max(int(ax.get_window_extent(fig.canvas.get_renderer()).width), 1)
 
 def plot_orbits(earth_positions, cruithne_positions):
     fig = plt.figure()
     ax = fig.add_subplot(111, projection='3d')
 
-    ax.plot(earth_positions[0], earth_positions[1], earth_positions[2], label='Земля', color='#0000FF')
-    ax.plot(cruithne_positions[0], cruithne_positions[1], cruithne_positions[2], label='Круитни', color='#FF0000')
+    # Орбиты - параметрические кривые без монотонной оси, поэтому ломаные
+    # прореживаются по геометрическому отклонению не больше одного пикселя
+    max_range = np.max(earth_positions)
+    tolerance = 2 * max_range / _pixel_width(fig, ax)
+    earth_idx = polyline_indices(earth_positions, tolerance)
+    cruithne_idx = polyline_indices(cruithne_positions, tolerance)
+    earth_shown = np.asarray(earth_positions[:, earth_idx])
+    cruithne_shown = np.asarray(cruithne_positions[:, cruithne_idx])
+
+    ax.plot(earth_shown[0], earth_shown[1], earth_shown[2], label='Земля', color='#0000FF')
+    ax.plot(cruithne_shown[0], cruithne_shown[1], cruithne_shown[2], label='Круитни', color='#FF0000')
 
-    max_range = max(max(earth_positions[0]), max(earth_positions[1]), max(earth_positions[2]))
     ax.set_xlim([-max_range, max_range])
     ax.set_ylim([-max_range, max_range])
     ax.set_zlim([-max_range, max_range])
@@ -26,9 +38,31 @@ def plot_orbits(earth_positions, cruithne_positions):
 
     plt.show()
 
-def animate_orbits(earth_positions, cruithne_positions):
-    """Создает анимацию орбит Земли и Круитни в абсолютной системе отсчета с отображением текущей даты."""
-    fig = plt.figure()
+def date_labels(frames, n_samples):
+    """
+    Подписи дат 'YYYY-MM-DD' для номеров кадров frames траектории из
+    n_samples равномерных точек на интервале delta_t лет. Все даты
+    вычисляются одним векторным вызовом astropy.
+    """
+    from astropy.time import Time, TimeDelta
+
+    days_per_sample = delta_t * 365.25 / (n_samples - 1)
+    times = Time(date, format='iso') + TimeDelta(np.asarray(frames) * days_per_sample, format='jd')
+    return [iso[:10] for iso in np.atleast_1d(times.iso)]
+
+def orbits_frames(n_samples):
+    """Номера кадров анимации орбит: начинаем с FRAME_NUM-го кадра."""
+    return range(FRAME_NUM, n_samples)
+
+def relative_orbit_frames(n_samples):
+    """Номера кадров анимации относительной орбиты (каждая RELATIVE_FRAME_STEP-я точка)."""
+    return range(FRAME_NUM, n_samples, RELATIVE_FRAME_STEP)
+
+def orbits_scene(fig, earth_positions, cruithne_positions):
+    """
+    Строит на фигуре fig сцену орбит Земли и Круитни в абсолютной системе отсчета.
+    Возвращает функцию update(frame, label), перерисовывающую кадр frame с подписью даты label.
+    """
     ax = fig.add_subplot(111, projection='3d')
 
     line_earth, = ax.plot([], [], [], label='Земля', color='#0000FF')
@@ -52,10 +86,7 @@ def animate_orbits(earth_positions, cruithne_positions):
     ax.set_zlabel(r'Z, (м)', fontsize=12)
     ax.legend()
 
-    # Преобразуем начальную дату в формат Time (Astropy)
-    t_start = Time(date, format='iso')
-
-    def update(frame):
+    def update(frame, label):
         # Показываем только последние FRAME_NUM точек
         start = max(0, frame - FRAME_NUM)
 
@@ -76,22 +107,17 @@ def animate_orbits(earth_positions, cruithne_positions):
         cruithne_marker.set_3d_properties([cruithne_positions[2, frame]])
 
         # Обновляем текст с текущей датой
-        current_time = t_start + TimeDelta(frame * delta_t, format='jd')  # Шаг времени в днях
-        date_text.set_text(f"Дата: {current_time.iso[:10]}")  # Показываем дату в формате 'YYYY-MM-DD'
+        date_text.set_text(f"Дата: {label}")
 
         return line_earth, line_cruithne, sun_marker, earth_marker, cruithne_marker, date_text
 
-    # Количество кадров
-    frames = range(FRAME_NUM, earth_positions.shape[1])  # Начинаем с FRAME_NUM-го кадра
+    return update
 
-    anim = FuncAnimation(fig, update, frames=frames, interval=INTERVAL, blit=True)
-    plt.show()
-
-    return anim
-
-def animate_relative_orbit(cruithne_relative_positions):
-    """Создает анимацию орбиты Круитни относительно Земли с отображением текущей даты."""
-    fig = plt.figure()
+def relative_orbit_scene(fig, cruithne_relative_positions):
+    """
+    Строит на фигуре fig сцену орбиты Круитни относительно Земли.
+    Возвращает функцию update(frame, label), перерисовывающую кадр frame с подписью даты label.
+    """
     ax = fig.add_subplot(111, projection='3d')
 
     earth_marker, = ax.plot([], [], [], marker='o', markersize=8, color='blue', label='Земля', linestyle='None')
@@ -111,10 +137,7 @@ def animate_relative_orbit(cruithne_relative_positions):
     ax.set_zlabel(r'Z (м)', fontsize=12)
     ax.legend()
 
-    # Преобразуем начальную дату в формат Time (Astropy)
-    t_start = Time(date, format='iso')
-
-    def update(frame):
+    def update(frame, label):
         # Показываем только последние FRAME_NUM точек
         start = max(0, frame - FRAME_NUM)
 
@@ -129,16 +152,39 @@ def animate_relative_orbit(cruithne_relative_positions):
         # cruithne_marker.set_3d_properties([cruithne_relative_positions[2, frame]])
 
         # Обновляем текст с текущей датой
-        current_time = t_start + TimeDelta(frame * delta_t * 365 / VECTORS_NUM, format='jd')  # Шаг времени в днях
-        date_text.set_text(f"Дата: {current_time.iso[:10]}")  # Показываем дату в формате 'YYYY-MM-DD'
+        date_text.set_text(f"Дата: {label}")
 
         return line_cruithne, earth_marker, cruithne_marker, date_text
 
-    frames = range(FRAME_NUM, cruithne_relative_positions.shape[1], 11)  # Начинаем с FRAME_NUM-го кадра
-    # frames = range(FRAME_NUM, cruithne_relative_positions.shape[1])  # Начинаем с FRAME_NUM-го кадра
+    return update
 
-    anim = FuncAnimation(fig, update, frames=frames, interval=INTERVAL, blit=False)
-    plt.show()
+def animate_orbits(earth_positions, cruithne_positions, show=True):
+    """Создает анимацию орбит Земли и Круитни в абсолютной системе отсчета с отображением текущей даты."""
+    fig = plt.figure()
+    update = orbits_scene(fig, earth_positions, cruithne_positions)
+
+    # Даты всех кадров считаются заранее, а не на каждом кадре
+    frames = orbits_frames(earth_positions.shape[1])
+    labels = date_labels(frames, earth_positions.shape[1])
+
+    anim = FuncAnimation(fig, lambda k: update(frames[k], labels[k]), frames=len(frames), interval=INTERVAL, blit=True)
+    if show:
+        plt.show()
+
+    return anim
+
+def animate_relative_orbit(cruithne_relative_positions, show=True):
+    """Создает анимацию орбиты Круитни относительно Земли с отображением текущей даты."""
+    fig = plt.figure()
+    update = relative_orbit_scene(fig, cruithne_relative_positions)
+
+    # Даты всех кадров считаются заранее, а не на каждом кадре
+    frames = relative_orbit_frames(cruithne_relative_positions.shape[1])
+    labels = date_labels(frames, cruithne_relative_positions.shape[1])
+
+    anim = FuncAnimation(fig, lambda k: update(frames[k], labels[k]), frames=len(frames), interval=INTERVAL, blit=False)
+    if show:
+        plt.show()
 
     return anim
 
@@ -162,11 +208,13 @@ def save_animation(anim, filename, file_format='mp4', fps=30):
 
     print(f"Анимация сохранена как {filename}.{file_format}")
 
-def plot_distances(earth_positions, cruithne_positions):
+def plot_distances(earth_positions, cruithne_positions, decimation='minmax'):
     """
     Строит график изменения расстояния от Круитни до Земли и до Солнца с течением времени.
     Ось X: годы от 'date' до 'date + delta_t'.
     Ось Y: расстояние в астрономических единицах (AU).
+    Ряды прореживаются до ширины графика в пикселях ('minmax' или 'lttb')
+    и заново прореживаются по видимому диапазону при масштабировании.
     """
     # Вычисляем расстояние от Круитни до Земли
     cruithne_to_earth_distances = np.linalg.norm(cruithne_positions - earth_positions, axis=0) / AU_IN_METERS
@@ -177,19 +225,42 @@ def plot_distances(earth_positions, cruithne_positions):
     # Вычисляем расстояние от Земли до Солнца
     earth_to_sun_distances = np.linalg.norm(earth_positions, axis=0) / AU_IN_METERS
 
+    from astropy.time import Time
+
     # Преобразуем начальную дату в формат Astropy
     t_start = Time(date, format='iso')
 
     # Создаем массив временных меток для оси X (в годах)
-    time_values = t_start + np.linspace(0, delta_t * 365.25, VECTORS_NUM)  # шаги в днях
+    time_values = t_start + np.linspace(0, delta_t * 365.25, earth_positions.shape[1])  # шаги в днях
     time_values_years = time_values.decimalyear  # преобразование в дробные годы
 
     # Создаем график
     fig, ax = plt.subplots()
 
-    ax.plot(time_values_years, cruithne_to_earth_distances, label="Расстояние Круитни-Земля", color='r', alpha = .5)
-    ax.plot(time_values_years, cruithne_to_sun_distances, label="Расстояние Круитни-Солнце", color='b', alpha = .5)
-    ax.plot(time_values_years, earth_to_sun_distances, label="Расстояние Земля-Солнце", color='g', linestyle='--', alpha = .5)
+    series = [
+        (cruithne_to_earth_distances, dict(label="Расстояние Круитни-Земля", color='r', alpha = .5)),
+        (cruithne_to_sun_distances, dict(label="Расстояние Круитни-Солнце", color='b', alpha = .5)),
+        (earth_to_sun_distances, dict(label="Расстояние Земля-Солнце", color='g', linestyle='--', alpha = .5)),
+    ]
+
+    n_pixels = _pixel_width(fig, ax)
+    lines = []
+    for distances, style in series:
+        idx = decimate(time_values_years, distances, n_pixels, decimation)
+        line, = ax.plot(time_values_years[idx], distances[idx], **style)
+        lines.append(line)
+
+    def on_xlim_changed(ax):
+        # Прореживаем заново только видимую часть рядов
+        x_min, x_max = ax.get_xlim()
+        i0 = max(np.searchsorted(time_values_years, x_min) - 1, 0)
+        i1 = min(np.searchsorted(time_values_years, x_max) + 1, time_values_years.size)
+        n_pixels = _pixel_width(fig, ax)
+        for line, (distances, _) in zip(lines, series):
+            idx = i0 + decimate(time_values_years[i0:i1], distances[i0:i1], n_pixels, decimation)
+            line.set_data(time_values_years[idx], distances[idx])
+
+    ax.callbacks.connect('xlim_changed', on_xlim_changed)
 
     ax.set_xlabel("Время (годы)", fontsize=12)
     ax.set_ylabel("Расстояние (AU)", fontsize=12)
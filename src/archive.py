@@ -0,0 +1,225 @@
+"""
+Компактный архив траекторий для хранения и сравнения прошлых расчетов.
+
+Траектория (6N, T) делится на части по chunk_size моментов времени, каждая
+часть пишется в отдельный файл chunk_<номер>.npz, а метаданные (эпоха, ID
+тел, настройки интегратора, параметры кодирования) - в meta.json.
+
+Способы кодирования части:
+    'quantized' - значения квантуются с шагом 2 * допуск (ошибка не больше
+                  допуска: ARCHIVE_POSITION_TOL для позиций и
+                  ARCHIVE_VELOCITY_TOL для скоростей), затем берутся
+                  разности порядка order по времени; остатки хранятся
+                  в самом узком целом типе, в который они помещаются;
+    'float32'   - отклонения от первого значения части в float32.
+Перед сжатием байты значений переставляются по старшинству (как shuffle
+в HDF5/Blosc), что заметно улучшает сжатие zlib.
+
+Позиции и скорости можно хранить относительно опорного тела (reference_body),
+например Земли. Разности берутся от уже квантованных значений опорного тела,
+поэтому все тела восстанавливаются с допуском квантования; позиции относительно
+опорного тела (как и между любыми двумя телами) - с удвоенным допуском.
+"""
+import json
+import os
+import numpy as np
+from global_consts import CHUNK_SIZE, ARCHIVE_POSITION_TOL, ARCHIVE_VELOCITY_TOL
+
+ARCHIVE_VERSION = 1
+
+def _row_tolerances(n_rows, position_tol, velocity_tol):
+    return np.tile(np.repeat([position_tol, velocity_tol], 3), n_rows // 6)
+
+def _relative_to(y, reference_body, sign):
+    # Вычитание (sign=-1) или добавление (sign=+1) состояния опорного тела к остальным телам
+    if reference_body is None:
+        return y
+    states = y.reshape(-1, 6, y.shape[-1]).copy()
+    others = np.arange(states.shape[0]) != reference_body
+    states[others] += sign * states[reference_body]
+    return states.reshape(y.shape)
+
+def _narrow(values):
+    """Самый узкий целый тип, в котором помещаются значения."""
+    bound = np.abs(values).max() if values.size else 0
+    for dtype in (np.int8, np.int16, np.int32):
+        if bound <= np.iinfo(dtype).max:
+            return values.astype(dtype)
+    return values
+
+def _shuffle(values):
+    """
+    Перестановка байтов: сначала все младшие байты ряда, затем следующие и т.д.
+    Старшие байты малых по модулю остатков почти постоянны и хорошо сжимаются.
+    """
+    values = np.ascontiguousarray(values)
+    rows, size = values.shape
+    return np.ascontiguousarray(values.view(np.uint8).reshape(rows, size, -1).transpose(0, 2, 1))
+
+def _unshuffle(data, dtype):
+    return np.ascontiguousarray(data.transpose(0, 2, 1)).view(dtype).reshape(data.shape[0], -1)
+
+def _encode_times(t):
+    # Равномерная сетка (как np.linspace в main) хранится только концами, если восстанавливается точно
+    if t.size > 1 and np.array_equal(t, np.linspace(t[0], t[-1], t.size)):
+        return {'t_range': np.array([t[0], t[-1], t.size])}
+    return {'t': _shuffle(t[None])}
+
+def _decode_times(chunk):
+    if 't_range' in chunk:
+        t0, t1, size = chunk['t_range']
+        return np.linspace(t0, t1, int(size))
+    return _unshuffle(chunk['t'], np.float64)[0]
+
+def _encode_chunk(y, mode, tolerances, order):
+    base = y[:, 0].copy()
+    if mode == 'float32':
+        values = (y - base[:, None]).astype(np.float32)
+        return {'base': base, 'values': _shuffle(values), 'dtype': np.array(values.dtype.str)}
+
+    scale = 2 * tolerances
+    residual = np.rint((y - base[:, None]) / scale[:, None]).astype(np.int64)
+    heads = []
+    for _ in range(min(order, y.shape[1] - 1)):
+        heads.append(residual[:, 0])
+        residual = np.diff(residual, axis=1)
+    residual = _narrow(residual)
+    return {'base': base, 'scale': scale, 'heads': np.array(heads, dtype=np.int64).reshape(-1, y.shape[0]),
+            'values': _shuffle(residual), 'dtype': np.array(residual.dtype.str)}
+
+def _decode_chunk(chunk, mode):
+    base = chunk['base']
+    values = _unshuffle(chunk['values'], np.dtype(str(chunk['dtype'])))
+    if mode == 'float32':
+        return base[:, None] + values.astype(float)
+
+    q = values.astype(np.int64)
+    for head in chunk['heads'][::-1]:
+        q = np.concatenate([head[:, None], head[:, None] + np.cumsum(q, axis=1)], axis=1)
+    return base[:, None] + q * chunk['scale'][:, None]
+
+def save_archive(directory, t, y, metadata=None, mode='quantized', order=4, reference_body=None,
+                 compress=True, chunk_size=CHUNK_SIZE, position_tol=ARCHIVE_POSITION_TOL,
+                 velocity_tol=ARCHIVE_VELOCITY_TOL):
+    """
+    Записывает траекторию в компактный архив.
+
+    Параметры:
+        directory (str):    каталог архива.
+        t (array_like):     моменты времени (T,).
+        y (array_like):     траектория (6N, T) в м и м/с (например solution.y).
+        metadata (dict):    произвольные метаданные: эпоха, ID тел, метод,
+                            допуски и т.п. (должны сериализоваться в JSON).
+        mode (str):         'quantized' или 'float32'.
+        order (int):        порядок разностей по времени для 'quantized'.
+        reference_body (int): номер тела, относительно которого хранятся остальные.
+        compress (bool):    сжимать части без потерь (zlib).
+        chunk_size (int):   число моментов времени в одной части.
+        position_tol, velocity_tol (float): допуски квантования в м и м/с.
+
+    Возвращает:
+        словарь метаданных архива (содержимое meta.json).
+    """
+    if mode not in ('quantized', 'float32'):
+        raise ValueError(f"Неизвестный способ кодирования архива: {mode}")
+    t = np.asarray(t, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if y.ndim != 2 or y.shape[0] % 6 or y.shape[1] != t.size:
+        raise ValueError(f"Ожидается траектория (6N, {t.size}), получен массив {y.shape}")
+
+    os.makedirs(directory, exist_ok=True)
+    tolerances = _row_tolerances(y.shape[0], position_tol, velocity_tol)
+    save = np.savez_compressed if compress else np.savez
+
+    chunks = []
+    for number, start in enumerate(range(0, t.size, chunk_size)):
+        stop = min(start + chunk_size, t.size)
+        part = y[:, start:stop]
+        if reference_body is not None:
+            # Остальные тела хранятся относительно уже квантованного опорного тела:
+            # при чтении к ним прибавляются те же декодированные значения, и ошибки
+            # опорного тела и разностей не складываются
+            rows = slice(6 * reference_body, 6 * reference_body + 6)
+            part = part.copy()
+            part[rows] = _decode_chunk(_encode_chunk(part[rows], mode, tolerances[rows], order), mode)
+            part = _relative_to(part, reference_body, -1)
+        name = f'chunk_{number:05d}.npz'
+        save(os.path.join(directory, name), **_encode_times(t[start:stop]),
+             **_encode_chunk(part, mode, tolerances, order))
+        chunks.append({'file': name, 'start': start, 'stop': stop,
+                       't_start': float(t[start]), 't_stop': float(t[stop - 1])})
+
+    meta = {
+        'version': ARCHIVE_VERSION,
+        'mode': mode,
+        'order': order,
+        'reference_body': reference_body,
+        'compress': compress,
+        'position_tol': position_tol,
+        'velocity_tol': velocity_tol,
+        'shape': list(y.shape),
+        'chunks': chunks,
+        'metadata': metadata or {},
+    }
+    tmp_path = os.path.join(directory, 'meta.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, os.path.join(directory, 'meta.json'))
+    return meta
+
+class ArchiveReader:
+    """
+    Ленивое чтение архива save_archive: с диска читаются и декодируются
+    только части, пересекающиеся с запрошенным интервалом времени.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, 'meta.json'), encoding='utf-8') as f:
+            self.meta = json.load(f)
+        if self.meta['version'] != ARCHIVE_VERSION:
+            raise ValueError(f"Неподдерживаемая версия архива: {self.meta['version']}")
+
+    @property
+    def metadata(self):
+        return self.meta['metadata']
+
+    def __len__(self):
+        return self.meta['shape'][1]
+
+    def read(self, t_start=None, t_stop=None):
+        """
+        Декодирует траекторию на отрезке [t_start, t_stop] (границы включаются).
+
+        Возвращает:
+            (t, y) - массивы (T,) и (6N, T).
+        """
+        t_parts, y_parts = [], []
+        for chunk in self.meta['chunks']:
+            if (t_start is not None and chunk['t_stop'] < t_start) or \
+                    (t_stop is not None and chunk['t_start'] > t_stop):
+                continue
+            with np.load(os.path.join(self.directory, chunk['file'])) as data:
+                t = _decode_times(data)
+                y = _decode_chunk(data, self.meta['mode'])
+            mask = np.ones(t.size, dtype=bool)
+            if t_start is not None:
+                mask &= t >= t_start
+            if t_stop is not None:
+                mask &= t <= t_stop
+            t_parts.append(t[mask])
+            y_parts.append(y[:, mask])
+
+        if not t_parts:
+            return np.empty(0), np.empty((self.meta['shape'][0], 0))
+        y = _relative_to(np.hstack(y_parts), self.meta['reference_body'], +1)
+        return np.concatenate(t_parts), y
+
+    def positions(self, body, t_start=None, t_stop=None):
+        """Позиции тела body, массив (3, T) на отрезке [t_start, t_stop]."""
+        return self.read(t_start, t_stop)[1][6 * body:6 * body + 3]
+
+    def relative_positions(self, body, reference, t_start=None, t_stop=None):
+        """Позиции тела body относительно тела reference, массив (3, T)."""
+        y = self.read(t_start, t_stop)[1]
+        return y[6 * body:6 * body + 3] - y[6 * reference:6 * reference + 3]
@@ -0,0 +1,188 @@
+"""
+Пакетный запуск сценариев из файла конфигурации:
+
+    python batch.py scenarios.json [--workers 4] [--force] [--fixtures DIR]
+
+С --fixtures DIR (или переменной окружения VPV_FIXTURE_DIR) элементы берутся
+из записанных ответов elements_<ID>.json в DIR, и сеть не нужна.
+
+Файл конфигурации (JSON):
+    results_dir - каталог результатов (по умолчанию 'results');
+    defaults    - значения по умолчанию для всех сценариев;
+    scenarios   - список сценариев с полями
+        name      - имя сценария (имя подкаталога результатов),
+        bodies    - ID тел в JPL Horizons,
+        massless  - ID тел, считающихся пробными частицами,
+        masses    - необязательный словарь масс по ID (иначе MASSES_BY_ID),
+        date, delta_t, vectors_num - эпоха, горизонт в годах и число точек,
+        method, rtol, atol, step   - настройки интегратора (см. solve_orbits).
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from global_consts import date, delta_t, VECTORS_NUM, INTEGRATOR, rtol_val, atol_val, MASSES_BY_ID, julian_date_from_iso
+
+SCENARIO_DEFAULTS = {
+    'date': date,
+    'delta_t': delta_t,
+    'vectors_num': VECTORS_NUM,
+    'method': INTEGRATOR,
+    'rtol': rtol_val,
+    'atol': atol_val,
+    'step': None,  # шаг по умолчанию для выбранной схемы (SYMPLECTIC_STEPS)
+    'massless': [],
+}
+
+def load_scenarios(config_path):
+    """Читает конфигурацию и возвращает (results_dir, список сценариев с подставленными умолчаниями)."""
+    with open(config_path, encoding='utf-8') as f:
+        config = json.load(f)
+    defaults = {**SCENARIO_DEFAULTS, **config.get('defaults', {})}
+    scenarios = [{**defaults, **scenario} for scenario in config['scenarios']]
+
+    names = [scenario['name'] for scenario in scenarios]
+    if len(set(names)) != len(names):
+        raise ValueError("Имена сценариев в конфигурации должны быть уникальными")
+    return config.get('results_dir', 'results'), scenarios
+
+def scenario_hash(scenario):
+    """Хеш содержимого сценария: неизмененный сценарий повторно не считается."""
+    return hashlib.sha256(json.dumps(scenario, sort_keys=True).encode()).hexdigest()
+
+def fetch_elements(scenarios):
+    """
+    Получает орбитальные элементы всех тел всех сценариев. Каждая пара
+    (ID, эпоха) запрашивается один раз и используется всеми сценариями.
+
+    Возвращает:
+        словарь {(ID, эпоха): (a, e, incl, Omega, w, M)}.
+    """
+    from get_coordinates import get_orbital_elements
+
+    elements = {}
+    for scenario in scenarios:
+        jd = julian_date_from_iso(scenario['date'])
+        for body in scenario['bodies']:
+            if (body, scenario['date']) not in elements:
+                df = get_orbital_elements(body, [jd])
+                elements[(body, scenario['date'])] = tuple(
+                    float(df[column][0]) for column in ('a', 'e', 'incl', 'Omega', 'w', 'M')
+                )
+    return elements
+
+def run_scenario(scenario, elements, output_dir):
+    """
+    Интегрирует один сценарий и сохраняет траекторию в output_dir/trajectory.npz.
+
+    Возвращает:
+        словарь со временем счета, числом вычислений правой части и
+        максимальной относительной ошибкой энергии.
+    """
+    from translation import kepler_to_vectors_batch
+    from diff_equation_solver import make_equations_of_motion, solve_orbits
+    from diagnostics import conservation_history
+
+    start_time = time.time()
+
+    bodies = scenario['bodies']
+    masses = np.array([scenario.get('masses', {}).get(body, MASSES_BY_ID.get(body)) for body in bodies],
+                      dtype=float)
+    if np.any(np.isnan(masses)):
+        raise ValueError(f"Неизвестна масса тела в сценарии {scenario['name']}")
+    massless = np.isin(bodies, scenario['massless'])
+
+    r, v = kepler_to_vectors_batch(*np.array(elements).T)
+    y0 = np.hstack([r, v]).ravel()
+
+    t_span = (0, scenario['delta_t'] * 365.25 * 24 * 3600)
+    t_eval = np.linspace(t_span[0], t_span[1], scenario['vectors_num'])
+    solution = solve_orbits(make_equations_of_motion(masses, massless), t_span, y0, t_eval,
+                            method=scenario['method'], step=scenario['step'], masses=masses, massless=massless,
+                            rtol=scenario['rtol'], atol=scenario['atol'])
+
+    os.makedirs(output_dir, exist_ok=True)
+    np.savez(os.path.join(output_dir, 'trajectory.npz'), t=solution.t, y=solution.y, bodies=np.array(bodies))
+
+    energy_error, _ = conservation_history(solution.y, masses, massless)
+    return {
+        'wall_time': time.time() - start_time,
+        'nfev': int(solution.nfev),
+        'max_energy_error': float(energy_error.max()),
+    }
+
+def _write_manifest(path, manifest):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def run_batch(config_path, workers=None, force=False):
+    """
+    Запускает все сценарии конфигурации в пуле процессов. Результаты и
+    manifest.json пишутся в results_dir; сценарии, хеш которых совпадает
+    с записанным в манифесте, пропускаются (если не задан force).
+    """
+    results_dir, scenarios = load_scenarios(config_path)
+    os.makedirs(results_dir, exist_ok=True)
+    manifest_path = os.path.join(results_dir, 'manifest.json')
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+
+    pending = []
+    for scenario in scenarios:
+        digest = scenario_hash(scenario)
+        entry = manifest.get(scenario['name'], {})
+        output_dir = os.path.join(results_dir, scenario['name'])
+        if (not force and entry.get('hash') == digest and entry.get('status') == 'done'
+                and os.path.exists(os.path.join(output_dir, 'trajectory.npz'))):
+            print(f"Сценарий {scenario['name']} не изменился, пропускаем")
+            continue
+        pending.append((scenario, digest, output_dir))
+
+    if not pending:
+        return manifest
+
+    elements = fetch_elements([scenario for scenario, _, _ in pending])
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(run_scenario, scenario,
+                            [elements[(body, scenario['date'])] for body in scenario['bodies']], output_dir):
+                (scenario, digest, output_dir)
+            for scenario, digest, output_dir in pending
+        }
+        for future in as_completed(futures):
+            scenario, digest, output_dir = futures[future]
+            entry = {'hash': digest, 'path': os.path.relpath(output_dir, results_dir), 'scenario': scenario}
+            try:
+                entry.update(future.result(), status='done')
+                print(f"Сценарий {scenario['name']} посчитан за {entry['wall_time']:.2f} секунд")
+            except Exception as e:
+                entry.update(status='failed', error=str(e))
+                print(f"Ошибка в сценарии {scenario['name']}: {e}")
+            manifest[scenario['name']] = entry
+            _write_manifest(manifest_path, manifest)
+
+    return manifest
+
+def main():
+    parser = argparse.ArgumentParser(description="Пакетный расчет сценариев движения тел")
+    parser.add_argument('config', help="JSON-файл со списком сценариев")
+    parser.add_argument('--workers', type=int, default=None, help="число процессов")
+    parser.add_argument('--force', action='store_true', help="пересчитать и неизмененные сценарии")
+    parser.add_argument('--fixtures', metavar='DIR', help="брать элементы из записанных ответов в DIR")
+    args = parser.parse_args()
+    if args.fixtures:
+        from get_coordinates import set_provider, FixtureProvider
+
+        set_provider(FixtureProvider(args.fixtures))
+    run_batch(args.config, args.workers, args.force)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Регрессионный тест времени запуска вычислительной части:
+
+    python bench_startup.py [--repeat 5] [--baseline startup_baseline.json] [--save-baseline]
+
+Для каждого модуля запускается `python -X importtime -c "import <модуль>"`,
+берется медиана суммарного времени импорта. Тест не проходит, если
+в вычислительном пути импортируются тяжелые графические или сетевые
+библиотеки или время выросло больше чем в tolerance раз по сравнению
+с сохраненной базовой линией.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import numpy as np
+
+# Модули вычислительного пути и библиотеки, которые они не должны импортировать
+COMPUTE_MODULES = ['main', 'diff_equation_solver', 'batch', 'ensemble']
+HEAVY_PACKAGES = ['astropy', 'matplotlib', 'astroquery', 'pandas']
+
+def import_profile(module):
+    """
+    Импортирует module в отдельном процессе с -X importtime.
+
+    Возвращает:
+        (суммарное время импорта модуля в мс, множество импортированных пакетов верхнего уровня).
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True, check=True)
+    cumulative = None
+    packages = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        packages.add(name.strip().split('.')[0])
+        # Модуль верхнего уровня записан без дополнительного отступа
+        if name == f' {module}':
+            cumulative = int(cumulative_us) / 1000
+    return cumulative, packages
+
+def run(modules, repeat):
+    """Медианное время импорта и тяжелые пакеты для каждого модуля."""
+    report = {}
+    for module in modules:
+        times = []
+        heavy = set()
+        for _ in range(repeat):
+            cumulative, packages = import_profile(module)
+            times.append(cumulative)
+            heavy |= packages & set(HEAVY_PACKAGES)
+        report[module] = {'import_ms': float(np.median(times)), 'heavy_imports': sorted(heavy)}
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Регрессионный тест времени запуска")
+    parser.add_argument('--repeat', type=int, default=5, help="число запусков на модуль")
+    parser.add_argument('--baseline', default='startup_baseline.json', help="файл базовой линии")
+    parser.add_argument('--save-baseline', action='store_true', help="сохранить результат как базовую линию")
+    parser.add_argument('--tolerance', type=float, default=1.3, help="допустимое замедление относительно базовой линии")
+    args = parser.parse_args()
+
+    report = run(COMPUTE_MODULES, args.repeat)
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    failed = False
+    print(f"{'модуль':<24}{'импорт, мс':>12}{'база, мс':>12}  тяжелые импорты")
+    for module, entry in report.items():
+        base = baseline.get(module, {}).get('import_ms')
+        base_text = f"{base:.1f}" if base is not None else '-'
+        print(f"{module:<24}{entry['import_ms']:>12.1f}{base_text:>12}  {', '.join(entry['heavy_imports']) or '-'}")
+        if entry['heavy_imports']:
+            failed = True
+        if base is not None and entry['import_ms'] > args.tolerance * base:
+            failed = True
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Базовая линия сохранена в {args.baseline}")
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+Воспроизводимый офлайн-бенчмарк интеграторов (работа / точность):
+
+    python benchmark.py [--methods RK45 DOP853 ...] [--rtol 1e-8 1e-10] [--steps 4 1]
+                        [--years 10 100] [--bodies 2 3] [--repeat 3]
+                        [--output bench.json] [--table bench.txt]
+
+Начальные условия заморожены (FROZEN_ELEMENTS), запросов к Horizons нет.
+Для каждой комбинации метода, точности (rtol для адаптивных методов или
+шага в сутках для симплектических), горизонта и числа тел записываются
+время счета (лучшее из repeat), число вычислений правой части, максимальные
+относительные ошибки энергии и момента импульса и ошибка конечных позиций
+относительно эталонного решения DOP853. Таблица печатается в фиксированном
+формате, так что ее можно сравнивать между коммитами обычным diff.
+
+    python benchmark.py --rhs [--bodies 2 10]
+
+сравнивает время одного вызова правой части и интегрирования RK45
+для реализаций 'numpy' и 'auto' (Numba).
+"""
+import argparse
+import json
+import time
+import numpy as np
+from global_consts import MASSES_BY_ID, AU_IN_METERS, M_earth, atol_val
+from translation import kepler_to_vectors_batch
+from diff_equation_solver import make_equations_of_motion, solve_orbits
+from diagnostics import conservation_history
+from integrators import SYMPLECTIC_STEPPERS
+from compiled import load_kernel
+
+# Приближенные оскулирующие элементы на 2000-01-01 (a [а.е.], e, i, Omega, w, M [град]),
+# замороженные для воспроизводимости
+FROZEN_ELEMENTS = {
+    "399": (1.00000102, 0.0167086, 0.00005, -11.26064, 114.20783, 358.617),
+    "3753": (0.99774, 0.51493, 19.8108, 126.2386, 43.7686, 30.0),
+    "599": (5.2026, 0.04849, 1.303, 100.464, 273.867, 20.020),
+    "699": (9.5549, 0.05551, 2.4889, 113.665, 339.392, 317.020),
+    "624": (5.2374, 0.0227, 18.17, 342.8, 185.4, 140.0),
+}
+# Наборы тел по их числу и пробные частицы среди них
+BODY_SETS = {
+    2: ["399", "3753"],
+    3: ["399", "3753", "599"],
+    4: ["399", "3753", "599", "699"],
+    5: ["399", "3753", "599", "699", "624"],
+}
+MASSLESS_IDS = {"3753", "624"}
+
+DEFAULT_METHODS = ['RK45', 'DOP853', 'LSODA', 'leapfrog', 'yoshida4', 'wisdom_holman', 'encke']
+REFERENCE_METHOD = 'DOP853'
+REFERENCE_RTOL = 1e-13
+# Число точек вывода: шаг вывода не должен ограничивать шаг симплектических схем
+SAMPLES = 200
+
+def frozen_system(n_bodies):
+    """
+    Начальные условия системы из n_bodies тел.
+
+    Возвращает:
+        (y0, masses, massless).
+    """
+    bodies = BODY_SETS[n_bodies]
+    r, v = kepler_to_vectors_batch(*np.array([FROZEN_ELEMENTS[body] for body in bodies]).T)
+    masses = np.array([MASSES_BY_ID[body] for body in bodies])
+    massless = np.isin(bodies, list(MASSLESS_IDS))
+    return np.hstack([r, v]).ravel(), masses, massless
+
+def synthetic_system(n_bodies):
+    """
+    Детерминированная система из n_bodies массивных тел с массой Земли
+    на слабо эксцентричных орбитах от 0.7 до 10 а.е. (для тестов скорости).
+    """
+    index = np.arange(n_bodies)
+    golden = 137.50776  # углы по золотому сечению не дают совпадающих положений
+    r, v = kepler_to_vectors_batch(np.linspace(0.7, 10, n_bodies), np.full(n_bodies, 0.05),
+                                   np.linspace(0, 10, n_bodies), index * golden, index * 2 * golden,
+                                   index * 3 * golden)
+    return np.hstack([r, v]).ravel(), np.full(n_bodies, M_earth), np.zeros(n_bodies, dtype=bool)
+
+def rhs_speedup(body_counts, calls=20000, years=10):
+    """
+    Время одного вызова правой части и интегрирования RK45 на years лет
+    для реализаций NumPy и Numba.
+
+    Возвращает:
+        список записей по числу тел.
+    """
+    if load_kernel() is None:
+        raise ValueError("Numba не установлена: сравнивать не с чем")
+    records = []
+    for n_bodies in body_counts:
+        y0, masses, massless = frozen_system(n_bodies) if n_bodies in BODY_SETS else synthetic_system(n_bodies)
+        t_span = (0, years * 365.25 * 24 * 3600)
+        record = {'bodies': n_bodies}
+        for backend in ('numpy', 'auto'):
+            rhs = make_equations_of_motion(masses, massless, backend)
+            rhs(0.0, y0)  # компиляция или загрузка ядра из кэша
+            start = time.perf_counter()
+            for _ in range(calls):
+                rhs(0.0, y0)
+            record[f'{backend}_call_us'] = (time.perf_counter() - start) / calls * 1e6
+            start = time.perf_counter()
+            solution = solve_orbits(rhs, t_span, y0, None, method='RK45', rtol=1e-10, atol=atol_val)
+            record[f'{backend}_solve_s'] = time.perf_counter() - start
+            record['nfev'] = int(solution.nfev)
+        records.append(record)
+    return records
+
+def format_rhs_table(records):
+    lines = [f"{'тел':>4}{'numpy, мкс':>12}{'numba, мкс':>12}{'ускор.':>8}"
+             f"{'numpy, с':>10}{'numba, с':>10}{'ускор.':>8}{'nfev':>10}"]
+    for r in records:
+        lines.append(f"{r['bodies']:>4}{r['numpy_call_us']:>12.2f}{r['auto_call_us']:>12.2f}"
+                     f"{r['numpy_call_us'] / r['auto_call_us']:>8.1f}{r['numpy_solve_s']:>10.3f}"
+                     f"{r['auto_solve_s']:>10.3f}{r['numpy_solve_s'] / r['auto_solve_s']:>8.1f}{r['nfev']:>10}")
+    return '\n'.join(lines)
+
+def run_case(y0, masses, massless, years, method, rtol=None, step_days=None, repeat=1, reference=None):
+    """
+    Один запуск бенчмарка.
+
+    Возвращает:
+        словарь с временем счета, nfev, ошибками энергии и момента импульса и
+        максимальной ошибкой конечной позиции относительно reference (в а.е.).
+    """
+    t_span = (0, years * 365.25 * 24 * 3600)
+    t_eval = np.linspace(t_span[0], t_span[1], SAMPLES)
+    equations_of_motion = make_equations_of_motion(masses, massless)
+    kwargs = {'masses': masses, 'massless': massless}
+    if step_days is not None:
+        kwargs['step'] = step_days * 24 * 3600
+    if rtol is not None:
+        kwargs.update(rtol=rtol, atol=atol_val)
+
+    wall_time = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        solution = solve_orbits(equations_of_motion, t_span, y0, t_eval, method=method, **kwargs)
+        wall_time = min(wall_time, time.perf_counter() - start)
+
+    energy_error, momentum_error = conservation_history(solution.y, masses, massless)
+    record = {
+        'wall_time': wall_time,
+        'nfev': int(solution.nfev),
+        'energy_error': float(energy_error.max()),
+        'momentum_error': float(momentum_error.max()),
+        'position_error_au': None,
+    }
+    if reference is not None:
+        delta = (solution.y[:, -1] - reference).reshape(-1, 6)[:, :3]
+        record['position_error_au'] = float(np.linalg.norm(delta, axis=1).max() / AU_IN_METERS)
+    return record
+
+def run(methods, rtols, steps, years_list, body_counts, repeat=1):
+    """Полный перебор сетки параметров; возвращает список записей."""
+    records = []
+    for n_bodies in body_counts:
+        y0, masses, massless = frozen_system(n_bodies)
+        for years in years_list:
+            reference_state = solve_orbits(make_equations_of_motion(masses, massless), (0, years * 365.25 * 24 * 3600),
+                                           y0, None, method=REFERENCE_METHOD, masses=masses, massless=massless,
+                                           rtol=REFERENCE_RTOL, atol=atol_val).y[:, -1]
+            for method in methods:
+                fixed_step = method in SYMPLECTIC_STEPPERS
+                for setting in (steps if fixed_step else rtols):
+                    case = {'bodies': n_bodies, 'years': years, 'method': method,
+                            'rtol': None if fixed_step else setting, 'step_days': setting if fixed_step else None}
+                    print(f"{n_bodies} тел, {years} лет, {method}, {'шаг' if fixed_step else 'rtol'} {setting:g}")
+                    case.update(run_case(y0, masses, massless, years, method, case['rtol'], case['step_days'],
+                                         repeat, reference_state))
+                    records.append(case)
+    return records
+
+def format_table(records):
+    """Таблица работа / точность в фиксированном формате."""
+    lines = [f"{'тел':>4}{'лет':>6}  {'метод':<14}{'rtol/шаг':>10}{'время, с':>10}{'nfev':>10}"
+             f"{'ошибка E':>11}{'ошибка L':>11}{'dr, а.е.':>11}"]
+    for r in sorted(records, key=lambda r: (r['bodies'], r['years'], r['method'], r['rtol'] or 0, r['step_days'] or 0)):
+        setting = f"{r['rtol']:.0e}" if r['rtol'] is not None else f"{r['step_days']:g} сут"
+        dr = f"{r['position_error_au']:.2e}" if r['position_error_au'] is not None else '-'
+        lines.append(f"{r['bodies']:>4}{r['years']:>6g}  {r['method']:<14}{setting:>10}{r['wall_time']:>10.3f}"
+                     f"{r['nfev']:>10}{r['energy_error']:>11.2e}{r['momentum_error']:>11.2e}{dr:>11}")
+    return '\n'.join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк интеграторов на замороженных начальных условиях")
+    parser.add_argument('--methods', nargs='+', default=DEFAULT_METHODS, help="методы solve_orbits")
+    parser.add_argument('--rtol', nargs='+', type=float, default=[1e-8, 1e-10, 1e-12], help="rtol адаптивных методов")
+    parser.add_argument('--steps', nargs='+', type=float, default=[4, 1], help="шаги симплектических схем в сутках")
+    parser.add_argument('--years', nargs='+', type=float, default=[10], help="горизонты интегрирования в годах")
+    parser.add_argument('--bodies', nargs='+', type=int, default=None,
+                        help="число тел (по умолчанию 2 3, для --rhs - 2 10)")
+    parser.add_argument('--repeat', type=int, default=3, help="число повторов (берется лучшее время)")
+    parser.add_argument('--output', help="JSON-файл с результатами")
+    parser.add_argument('--table', help="текстовый файл с таблицей")
+    parser.add_argument('--rhs', action='store_true', help="сравнить реализации правой части NumPy и Numba")
+    args = parser.parse_args()
+
+    if args.rhs:
+        records = rhs_speedup(args.bodies or [2, 10])
+        table = format_rhs_table(records)
+    else:
+        bodies = args.bodies or [2, 3]
+        unknown = sorted(set(bodies) - set(BODY_SETS))
+        if unknown:
+            raise ValueError(f"Нет замороженных начальных условий для {unknown} тел, доступно: {sorted(BODY_SETS)}")
+        records = run(args.methods, args.rtol, args.steps, args.years, bodies, args.repeat)
+        table = format_table(records)
+    print(table)
+    if args.table:
+        with open(args.table, 'w', encoding='utf-8') as f:
+            f.write(table + '\n')
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(records, f, indent=2)
+
+if __name__ == "__main__":
+    main()
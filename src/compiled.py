@@ -0,0 +1,68 @@
+import functools
+import numpy as np
+
+@functools.lru_cache(maxsize=None)
+def load_kernel():
+    """
+    Компилирует ядро правой части уравнений движения через Numba.
+    Скомпилированный код кэшируется на диске (cache=True), поэтому процессы
+    пула не компилируют его заново. Numba импортируется только здесь,
+    чтобы не замедлять запуск вычислительных модулей.
+
+    Возвращает:
+        функцию kernel(y, gm, sources, gm_central, out) или None, если
+        Numba не установлена.
+    """
+    try:
+        from numba import njit
+    except ImportError:
+        return None
+
+    @njit(cache=True)
+    def kernel(y, gm, sources, gm_central, out):
+        n = y.size // 6
+        for i in range(n):
+            x, yy, z = y[6 * i], y[6 * i + 1], y[6 * i + 2]
+            out[6 * i] = y[6 * i + 3]
+            out[6 * i + 1] = y[6 * i + 4]
+            out[6 * i + 2] = y[6 * i + 5]
+
+            r2 = x * x + yy * yy + z * z
+            f = gm_central / (r2 * np.sqrt(r2))
+            ax, ay, az = -f * x, -f * yy, -f * z
+            for k in range(sources.size):
+                j = sources[k]
+                if j == i:
+                    continue
+                dx = x - y[6 * j]
+                dy = yy - y[6 * j + 1]
+                dz = z - y[6 * j + 2]
+                d2 = dx * dx + dy * dy + dz * dz
+                f = gm[j] / (d2 * np.sqrt(d2))
+                ax -= f * dx
+                ay -= f * dy
+                az -= f * dz
+            out[6 * i + 3] = ax
+            out[6 * i + 4] = ay
+            out[6 * i + 5] = az
+
+    return kernel
+
+def make_compiled_rhs(gm, sources, gm_central):
+    """
+    Правая часть f(t, y) на скомпилированном ядре или None, если Numba
+    недоступна. Результат каждый раз пишется в новый массив: решатели
+    solve_ivp хранят возвращенные производные между вызовами.
+    """
+    kernel = load_kernel()
+    if kernel is None:
+        return None
+    gm = np.ascontiguousarray(gm, dtype=np.float64)
+    sources = np.ascontiguousarray(sources, dtype=np.int64)
+
+    def rhs(t, y):
+        out = np.empty(6 * gm.size)
+        kernel(np.ascontiguousarray(y, dtype=np.float64), gm, sources, gm_central, out)
+        return out
+
+    return rhs
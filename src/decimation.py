@@ -0,0 +1,109 @@
+import numpy as np
+
+def minmax_indices(y, n_buckets):
+    """
+    Прореживание с сохранением формы: ряд (или ряды (K, T)) делится на
+    n_buckets равных частей, в каждой оставляются точки минимума и максимума.
+
+    Возвращает:
+        отсортированный массив индексов (не более 2 * K * n_buckets + 2).
+    """
+    y = np.atleast_2d(y)
+    n = y.shape[-1]
+    if n <= 2 * n_buckets:
+        return np.arange(n)
+
+    size = -(-n // n_buckets)
+    # Дополняем последним значением до целого числа частей одинаковой длины
+    padded = np.pad(y, ((0, 0), (0, n_buckets * size - n)), mode='edge').reshape(y.shape[0], n_buckets, size)
+    offsets = np.arange(n_buckets) * size
+    imin = padded.argmin(axis=-1) + offsets
+    imax = padded.argmax(axis=-1) + offsets
+
+    idx = np.concatenate([imin.ravel(), imax.ravel(), [0, n - 1]])
+    return np.unique(np.minimum(idx, n - 1))
+
+def polyline_indices(points, tolerance):
+    """
+    Прореживание ломаной (в том числе пространственной) алгоритмом
+    Дугласа-Пекера: остаются только точки, без которых ломаная отошла бы
+    от исходной дальше чем на tolerance. В отличие от minmax_indices и
+    lttb_indices не требует монотонной оси x, поэтому подходит для орбит.
+
+    Параметры:
+        points (ndarray):  координаты точек (D, T).
+        tolerance (float): допустимое отклонение в единицах координат.
+
+    Возвращает:
+        отсортированный массив индексов (первая и последняя точки входят всегда).
+    """
+    p = np.asarray(points, dtype=float).T
+    n = p.shape[0]
+    if n <= 2:
+        return np.arange(n)
+
+    keep = np.zeros(n, dtype=bool)
+    keep[[0, n - 1]] = True
+    stack = [(0, n - 1)]
+    while stack:
+        lo, hi = stack.pop()
+        if hi - lo < 2:
+            continue
+        # Расстояния до отрезка (а не до прямой): концы замкнутого витка могут совпадать
+        ab = p[hi] - p[lo]
+        ap = p[lo + 1:hi] - p[lo]
+        ab2 = ab @ ab
+        s = np.clip(ap @ ab / ab2, 0, 1) if ab2 > 0 else np.zeros(hi - lo - 1)
+        offset = ap - s[:, None] * ab
+        dist2 = np.einsum('ij,ij->i', offset, offset)
+        k = int(np.argmax(dist2))
+        if dist2[k] > tolerance**2:
+            mid = lo + 1 + k
+            keep[mid] = True
+            stack.extend([(lo, mid), (mid, hi)])
+
+    return np.flatnonzero(keep)
+
+def lttb_indices(x, y, n_out):
+    """
+    Прореживание алгоритмом Largest-Triangle-Three-Buckets: из каждой части
+    выбирается точка, образующая треугольник наибольшей площади с предыдущей
+    выбранной точкой и средним следующей части.
+
+    Возвращает:
+        массив из n_out индексов.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = x.size
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    idx = np.empty(n_out, dtype=int)
+    idx[0] = 0
+    idx[-1] = n - 1
+
+    a = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        next_lo = edges[b + 1]
+        next_hi = edges[b + 2] if b + 2 < edges.size else n
+        if b + 2 >= edges.size:
+            next_lo = n - 1
+        cx = x[next_lo:next_hi].mean()
+        cy = y[next_lo:next_hi].mean()
+
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        idx[b + 1] = a
+
+    return idx
+
+def decimate(x, y, n_pixels, method='minmax'):
+    """Индексы точек ряда y(x) для отображения в n_pixels пикселей по ширине."""
+    if method == 'lttb':
+        return lttb_indices(x, y, 2 * n_pixels)
+    if method == 'minmax':
+        return minmax_indices(y, n_pixels)
+    raise ValueError(f"Неизвестный метод прореживания: {method}")
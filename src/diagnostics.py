@@ -0,0 +1,165 @@
+import numpy as np
+import scipy.integrate
+from scipy.optimize import OptimizeResult
+from global_consts import G, GM_sun, BODY_MASSES, BODY_MASSLESS, MONITOR_EVERY, MONITOR_THRESHOLD
+
+class EnergyDriftError(RuntimeError):
+    """Относительный дрейф энергии превысил допустимый порог во время интегрирования."""
+
+def _as_bodies(y):
+    """Приводит (6N,), (6N, T) или (N, 6, T) к массиву (N, 6, T)."""
+    y = np.asarray(y, dtype=float)
+    if y.ndim == 3:
+        return y
+    if y.ndim == 1:
+        return y.reshape(-1, 6, 1)
+    return y.reshape(-1, 6, y.shape[-1])
+
+def nbody_energy(y, masses=BODY_MASSES, massless=BODY_MASSLESS):
+    """
+    Полная энергия системы N тел для одного состояния или целой траектории.
+
+    Параметры:
+        y: вектор состояния (6N,), траектория (6N, T) или (N, 6, T).
+        masses (array_like):   массы тел в кг.
+        massless (array_like): маска пробных частиц (как в make_equations_of_motion):
+                               взаимодействие учитывается только с массивными телами.
+
+    Возвращает:
+        энергию в Дж - число или массив (T,).
+    """
+    states = _as_bodies(y)
+    m = np.asarray(masses, dtype=float)
+    r = states[:, :3, :]
+    v = states[:, 3:, :]
+
+    r_norm = np.sqrt(np.einsum('ikt,ikt->it', r, r))
+    energy = np.einsum('i,it->t', m, 0.5 * np.einsum('ikt,ikt->it', v, v) - GM_sun / r_norm)
+
+    massless = np.zeros(m.size, dtype=bool) if massless is None else np.asarray(massless, dtype=bool)
+    sources = np.flatnonzero(~massless)
+    if sources.size:
+        diff = r[:, None, :, :] - r[None, sources, :, :]
+        dist = np.sqrt(np.einsum('ijkt,ijkt->ijt', diff, diff))
+        dist[sources, np.arange(sources.size)] = np.inf
+        # Пары массивных тел встречаются дважды
+        weights = np.outer(m, m[sources]) * np.where(massless, 1.0, 0.5)[:, None]
+        energy -= G * np.einsum('ij,ijt->t', weights, 1 / dist)
+
+    return energy[0] if np.ndim(y) == 1 else energy
+
+def nbody_angular_momentum(y, masses=BODY_MASSES):
+    """
+    Полный момент импульса системы относительно Солнца: вектор (3,)
+    для одного состояния или массив (3, T) для траектории.
+    """
+    states = _as_bodies(y)
+    L = np.einsum('i,ikt->kt', np.asarray(masses, dtype=float),
+                  np.cross(states[:, :3, :], states[:, 3:, :], axis=1))
+    return L[:, 0] if np.ndim(y) == 1 else L
+
+def conservation_history(y, masses=BODY_MASSES, massless=BODY_MASSLESS):
+    """
+    Относительные ошибки энергии и модуля момента импульса во все
+    моменты траектории относительно первого момента.
+
+    Возвращает:
+        (energy_error, momentum_error) - массивы (T,).
+    """
+    energy = nbody_energy(y, masses, massless)
+    momentum = np.linalg.norm(nbody_angular_momentum(y, masses), axis=0)
+    return np.abs(energy / energy[0] - 1), np.abs(momentum / momentum[0] - 1)
+
+class DriftMonitor:
+    """
+    Контроль дрейфа энергии во время интегрирования: каждые every шагов
+    вычисляется относительная ошибка энергии. При превышении threshold
+    расчет прерывается (action='abort') или повторяется с уменьшенными
+    в tighten_factor раз допусками (action='tighten', не более max_tightenings
+    раз). Дрейф отсчитывается от начала расчета, поэтому повтор начинается
+    с последней проверки, где дрейф не превышал threshold / tighten_factor:
+    с более строгими допусками остается запас до порога.
+    """
+
+    def __init__(self, energy=nbody_energy, every=MONITOR_EVERY, threshold=MONITOR_THRESHOLD,
+                 action='abort', tighten_factor=10, max_tightenings=3):
+        if action not in ('abort', 'tighten'):
+            raise ValueError(f"Неизвестное действие монитора: {action}")
+        self.energy = energy
+        self.every = every
+        self.threshold = threshold
+        self.action = action
+        self.tighten_factor = tighten_factor
+        self.max_tightenings = max_tightenings
+
+def solve_monitored(equations_of_motion, t_span, y0, t_eval, monitor, method, rtol, atol):
+    """
+    Интегрирует уравнения пошагово решателем solve_ivp (RK45, DOP853, ...)
+    с контролем дрейфа энергии через monitor (DriftMonitor).
+
+    Возвращает:
+        решение с полями t, y, как у solve_ivp (при сбое - только до последней
+        посчитанной точки t_eval), а также drift_checks -
+        массив (K, 2) пар (t, дрейф) и tightenings - число ужесточений допусков.
+    """
+    # Как и solve_ivp, принимаем имя метода или класс решателя (например, из profiling)
+    solver_class = getattr(scipy.integrate, method) if isinstance(method, str) else method
+    t_eval = np.asarray(t_span if t_eval is None else t_eval, dtype=float)
+    y0 = np.asarray(y0, dtype=float)
+    y = np.empty((y0.size, t_eval.size))
+    energy0 = monitor.energy(y0)
+
+    checks = []
+    tightenings = 0
+    nfev = 0
+    # Последняя проверка с запасом до порога: (t, состояние, число заполненных точек t_eval)
+    safe = (t_span[0], y0, 0)
+    while True:
+        t_start, y_start, filled = safe
+        solver = solver_class(equations_of_motion, t_start, y_start, t_span[1], rtol=rtol, atol=atol)
+        if filled < t_eval.size and t_eval[filled] == t_start:
+            y[:, filled] = y_start
+            filled += 1
+
+        steps = 0
+        restart = False
+        message = None
+        while solver.status == 'running':
+            message = solver.step()
+            if solver.status == 'failed':
+                break
+            steps += 1
+
+            n_new = np.searchsorted(t_eval, solver.t, side='right') - filled
+            if n_new > 0:
+                dense = solver.dense_output()
+                y[:, filled:filled + n_new] = dense(t_eval[filled:filled + n_new])
+                filled += n_new
+
+            if steps % monitor.every == 0 or solver.status == 'finished':
+                drift = abs(monitor.energy(solver.y) / energy0 - 1)
+                checks.append((solver.t, drift))
+                if drift <= monitor.threshold:
+                    if drift <= monitor.threshold / monitor.tighten_factor:
+                        safe = (solver.t, solver.y.copy(), filled)
+                elif monitor.action == 'tighten' and tightenings < monitor.max_tightenings:
+                    rtol /= monitor.tighten_factor
+                    atol /= monitor.tighten_factor
+                    tightenings += 1
+                    restart = True
+                    break
+                else:
+                    raise EnergyDriftError(
+                        f"Дрейф энергии {drift:.2e} превысил порог {monitor.threshold:.2e} при t = {solver.t:.6e} с"
+                    )
+
+        nfev += solver.nfev
+        if not restart:
+            break
+
+    success = solver.status == 'finished'
+    # При сбое решателя возвращаются только заполненные точки, как у solve_ivp
+    return OptimizeResult(t=t_eval[:filled], y=y[:, :filled], nfev=nfev, njev=solver.njev, nlu=solver.nlu,
+                          status=0 if success else -1, success=success,
+                          message=message if not success else "Интегрирование завершено",
+                          drift_checks=np.array(checks), tightenings=tightenings)
@@ -1,35 +1,206 @@
 import numpy as np
 from scipy.integrate import solve_ivp
-from global_consts import GM_sun, GM_earth, rtol_val, atol_val, G, m_cruithne, M_earth
-
-def equations_of_motion(t, y):
-    xE, yE, zE, vxE, vyE, vzE, xC, yC, zC, vxC, vyC, vzC = y
-
-    rE_sun = np.sqrt(xE**2 + yE**2 + zE**2)
-    rC_sun = np.sqrt(xC**2 + yC**2 + zC**2)
-    rCE = np.sqrt((xC - xE)**2 + (yC - yE)**2 + (zC - zE)**2)
-
-    axE_sun = -GM_sun * xE / (rE_sun**3)
-    ayE_sun = -GM_sun * yE / (rE_sun**3)
-    azE_sun = -GM_sun * zE / (rE_sun**3)
-
-    axC_sun = -GM_sun * xC / (rC_sun**3)
-    ayC_sun = -GM_sun * yC / (rC_sun**3)
-    azC_sun = -GM_sun * zC / (rC_sun**3)
-
-    axC_earth = -GM_earth * (xC - xE) / (rCE**3)
-    ayC_earth = -GM_earth * (yC - yE) / (rCE**3)
-    azC_earth = -GM_earth * (zC - zE) / (rCE**3)
-
-    return [
-        vxE, vyE, vzE, axE_sun, ayE_sun, azE_sun,  
-        vxC, vyC, vzC, axC_sun + axC_earth, ayC_sun + ayC_earth, azC_sun + azC_earth  
-    ]
-
-def solve_orbits(equations_of_motion, t_span, y0, t_eval):
-    return solve_ivp(equations_of_motion, t_span, y0, method='RK45', t_eval=t_eval, rtol=rtol_val, atol=atol_val)
+from global_consts import GM_sun, GM_earth, rtol_val, atol_val, G, m_cruithne, M_earth, BODY_MASSES, BODY_MASSLESS, SYMPLECTIC_STEPS, RHS_BACKEND
+from integrators import SYMPLECTIC_STEPPERS, integrate_fixed_step
+from trajectory import Trajectory, HermiteTrajectory
+from events import find_events, substep_grid, stop_at_terminal
+from encke import solve_encke
+from diagnostics import solve_monitored
+from compiled import make_compiled_rhs
+
+def nbody_accelerations(r, gm, sources, gm_central=GM_sun):
+    """
+    Вычисляет ускорения N тел в гелиоцентрической системе координат
+    (Солнце неподвижно в начале координат).
+
+    Параметры:
+        r (ndarray):       Позиции тел, массив (..., N, 3) в метрах
+                           (ведущие оси - независимые моменты времени).
+        gm (ndarray):      Гравитационные параметры тел G*m, массив (N,).
+        sources (ndarray): Индексы массивных тел, которые притягивают остальные.
+        gm_central (float): Гравитационный параметр центрального тела.
+
+    Возвращает:
+        ndarray (..., N, 3) ускорений в м/с^2.
+    """
+    r_norm = np.sqrt(np.einsum('...ij,...ij->...i', r, r))
+    acc = -gm_central * r / r_norm[..., None]**3
+
+    if sources.size:
+        # Попарные разности только с массивными телами: (..., N, K, 3)
+        diff = r[..., :, None, :] - r[..., None, sources, :]
+        dist2 = np.einsum('...ijk,...ijk->...ij', diff, diff)
+        # Тело не притягивает само себя
+        dist2[..., sources, np.arange(sources.size)] = np.inf
+        acc -= np.einsum('...ij,...ijk->...ik', gm[sources] * dist2**-1.5, diff)
+
+    return acc
+
+def gravity_sources(masses, massless=None):
+    """Возвращает гравитационные параметры тел и индексы массивных тел."""
+    gm = G * np.asarray(masses, dtype=float)
+    if massless is None:
+        massless = np.zeros(gm.size, dtype=bool)
+    sources = np.flatnonzero(~np.asarray(massless, dtype=bool))
+    return gm, sources
+
+def state_derivatives(y, masses=BODY_MASSES, massless=BODY_MASSLESS):
+    """Производные для массива состояний (6N, T) сразу во все моменты времени."""
+    gm, sources = gravity_sources(masses, massless)
+    states = np.asarray(y, dtype=float).T.reshape(y.shape[1], -1, 6)
+    dydt = np.empty_like(states)
+    dydt[..., :3] = states[..., 3:]
+    dydt[..., 3:] = nbody_accelerations(states[..., :3], gm, sources)
+    return dydt.reshape(y.shape[1], -1).T
+
+def make_equations_of_motion(masses, massless=None, backend=RHS_BACKEND):
+    """
+    Создает правую часть уравнений движения N тел для solve_ivp.
+
+    Вектор состояния y имеет длину 6N и состоит из блоков
+    (x, y, z, vx, vy, vz) для каждого тела.
+
+    Параметры:
+        masses (array_like):   Массы тел в кг, массив (N,).
+        massless (array_like): Маска безмассовых тел (пробных частиц). Они не
+                               притягивают остальные тела, поэтому не участвуют
+                               во взаимных O(N^2) слагаемых.
+        backend (str):         'auto' - скомпилированное ядро Numba (если Numba
+                               не установлена - NumPy), 'numpy' - только NumPy.
+                               Ядро загружается при первом вызове, а не при
+                               создании функции.
+
+    Возвращает:
+        функцию f(t, y), возвращающую производную вектора состояния.
+    """
+    if backend not in ('auto', 'numpy'):
+        raise ValueError(f"Неизвестная реализация правой части: {backend}")
+    gm, sources = gravity_sources(masses, massless)
+
+    def numpy_rhs(t, y):
+        state = np.asarray(y, dtype=float).reshape(-1, 6)
+        dydt = np.empty_like(state)
+        dydt[:, :3] = state[:, 3:]
+        dydt[:, 3:] = nbody_accelerations(state[:, :3], gm, sources)
+        return dydt.ravel()
+
+    if backend == 'numpy':
+        return numpy_rhs
+
+    impl = None
+
+    def rhs(t, y):
+        nonlocal impl
+        if impl is None:
+            impl = make_compiled_rhs(gm, sources, GM_sun) or numpy_rhs
+        return impl(t, y)
+
+    return rhs
+
+# Земля и Круитни (Круитни - пробная частица, как и в исходной постановке)
+equations_of_motion = make_equations_of_motion(BODY_MASSES, BODY_MASSLESS)
+
+def solve_orbits(equations_of_motion, t_span, y0, t_eval, method='RK45', step=None,
+                 masses=BODY_MASSES, massless=BODY_MASSLESS, dense_output=False, events=None, monitor=None,
+                 rtol=rtol_val, atol=atol_val):
+    """
+    Интегрирует уравнения движения на интервале t_span.
+
+    Параметры:
+        equations_of_motion: правая часть для методов solve_ivp.
+        t_span, y0, t_eval:  как в solve_ivp.
+        method (str):        метод solve_ivp ('RK45', 'DOP853', ...) или
+                             симплектическая схема с постоянным шагом:
+                             'leapfrog', 'yoshida4', 'wisdom_holman', или
+                             'encke' - метод Энке (отклонения от кеплеровых
+                             орбит интегрируются методом RK45). Вместо имени
+                             метода solve_ivp можно передать класс решателя
+                             (см. profiling.instrumented_solver).
+        step (float):        шаг симплектических схем в секундах
+                             (по умолчанию - SYMPLECTIC_STEPS[method]).
+        masses, massless:    массы тел и маска пробных частиц для
+                             симплектических схем и метода Энке.
+        dense_output (bool): добавить к решению поле trajectory - объект
+                             Trajectory, вычислимый в любые моменты времени.
+                             В этом случае t_eval можно не задавать (None).
+        events (list):       функции событий (см. модуль events). Моменты событий
+                             находятся по непрерывному решению и возвращаются
+                             в полях t_events и y_events, как у solve_ivp.
+                             Смена знака ищется на сетке из EVENT_SUBSTEPS точек
+                             на шаг solve_ivp (для схем с постоянным шагом - по
+                             узлам шагов), а не только на концах шагов.
+                             События ищутся после интегрирования: при событии
+                             с признаком terminal решение обрезается в его момент.
+        monitor (DriftMonitor): контроль дрейфа энергии во время интегрирования
+                             (только для методов solve_ivp, без dense_output и events).
+        rtol, atol (float):  допуски методов solve_ivp. Метод Энке использует
+                             только rtol: абсолютная точность отклонений
+                             берется от масштаба гелиоцентрических векторов.
+
+    Возвращает:
+        решение с полями t и y, как у solve_ivp.
+    """
+    if method in SYMPLECTIC_STEPPERS:
+        gm, sources = gravity_sources(masses, massless)
+        # В схеме Уиздома-Холмана притяжение Солнца учитывается кеплеровским дрейфом
+        gm_central = 0.0 if method == 'wisdom_holman' else GM_sun
+
+        def accel(r):
+            return nbody_accelerations(r, gm, sources, gm_central)
+
+        if step is None:
+            step = SYMPLECTIC_STEPS[method]
+        need_nodes = dense_output or events is not None
+        solution = integrate_fixed_step(SYMPLECTIC_STEPPERS[method], accel, t_span, y0, t_eval, step,
+                                        dense_output=need_nodes)
+        if need_nodes:
+            trajectory = HermiteTrajectory(
+                solution.t_nodes, solution.y_nodes, state_derivatives(solution.y_nodes, masses, massless)
+            )
+            if events is not None:
+                solution.t_events, solution.y_events = find_events(trajectory, events)
+                stop_at_terminal(solution, events)
+            if dense_output:
+                solution.trajectory = trajectory
+        return solution
+
+    if method == 'encke':
+        if dense_output or events is not None:
+            raise ValueError("Метод Энке не поддерживает dense_output и events")
+        gm, sources = gravity_sources(masses, massless)
+
+        def accel(r):
+            return nbody_accelerations(r, gm, sources, 0.0)
+
+        return solve_encke(accel, t_span, y0, t_eval, rtol)
+
+    if monitor is not None:
+        if dense_output or events is not None:
+            raise ValueError("Контроль дрейфа энергии не поддерживает dense_output и events")
+        return solve_monitored(equations_of_motion, t_span, y0, t_eval, monitor, method, rtol, atol)
+
+    # solve_ivp проверяет знак функций событий только на концах шагов и теряет
+    # пару корней внутри одного шага (короткое сближение), поэтому события
+    # ищутся по непрерывному решению на сетке из EVENT_SUBSTEPS точек на шаг
+    need_sol = dense_output or events is not None
+    solution = solve_ivp(equations_of_motion, t_span, y0, method=method, t_eval=t_eval, rtol=rtol, atol=atol,
+                         dense_output=need_sol)
+    if need_sol:
+        trajectory = Trajectory(solution.sol, t_span[0], t_span[1], solution.sol.n_segments)
+        if events is not None:
+            solution.t_events, solution.y_events = find_events(trajectory, events, substep_grid(solution.sol.ts))
+            stop_at_terminal(solution, events)
+        if dense_output:
+            solution.trajectory = trajectory
+        else:
+            solution.sol = None
+    return solution
 
 def calculate_energy(y):
+    """
+    Полная энергия системы Земля-Круитни. Принимает вектор состояния (12,)
+    или всю траекторию (12, T) - тогда возвращает массив (T,).
+    """
     xE, yE, zE, vxE, vyE, vzE, xC, yC, zC, vxC, vyC, vzC = y
 
     rE_sun = np.sqrt(xE**2 + yE**2 + zE**2)
@@ -47,22 +218,17 @@ def calculate_energy(y):
     return total_energy
 
 def calculate_angular_momentum(y):
-    xE, yE, zE, vxE, vyE, vzE, xC, yC, zC, vxC, vyC, vzC = y
-
-    rE = np.array([xE, yE, zE])
-
-    rC = np.array([xC, yC, zC])
-
-    vE = np.array([vxE, vyE, vzE])
-
-    vC = np.array([vxC, vyC, vzC])
-
-    M_earth = GM_earth / G  
+    """
+    Момент импульса системы Земля-Круитни относительно Солнца.
+    Для вектора состояния (12,) возвращает вектор (3,), для траектории
+    (12, T) - массив (3, T).
+    """
+    y = np.asarray(y)
 
-    L_earth = np.cross(rE, M_earth * vE)
+    L_earth = M_earth * np.cross(y[0:3], y[3:6], axis=0)
 
-    L_cruithne = np.cross(rC, m_cruithne * vC)
+    L_cruithne = m_cruithne * np.cross(y[6:9], y[9:12], axis=0)
 
     total_angular_momentum = L_earth + L_cruithne
 
-    return total_angular_momentum
\ No newline at end of file
+    return total_angular_momentum
@@ -0,0 +1,165 @@
+import math
+import numpy as np
+from scipy.integrate import solve_ivp
+from scipy.optimize import OptimizeResult
+from global_consts import GM_sun, ENCKE_RECTIFY
+from integrators import kepler_drift
+
+def _battin_f(q):
+    """f(q) = (1 + q)^(3/2) - 1 без потери точности при малых q (формула Баттина)."""
+    return q * (3 + 3 * q + q * q) / (1 + (1 + q)**1.5)
+
+def _reference_states(r_ref, v_ref, dt, mu):
+    """Состояния опорных кеплеровых орбит в моменты dt (M,), массив (6N, M)."""
+    n_bodies = r_ref.shape[0]
+    r, v = kepler_drift(np.tile(r_ref, (dt.size, 1)), np.tile(v_ref, (dt.size, 1)),
+                        np.repeat(dt, n_bodies), mu)
+    return np.hstack([r, v]).reshape(dt.size, -1).T
+
+class _ReferenceOrbits:
+    """
+    Позиции опорных кеплеровых орбит для правой части и события ректификации.
+    Элементы орбит вычисляются один раз на сегмент, позиции запоминаются для
+    последнего момента t (событие проверяется в конце шага, где правая часть
+    уже вычислена), а метод Ньютона для уравнения Кеплера стартует с линейного
+    прогноза от решения в предыдущий момент: соседние вызовы решателя близки
+    по времени, и одной-двух итераций достаточно.
+    """
+
+    def __init__(self, r_ref, v_ref, t_ref, mu, tol=1e-14, max_iter=50):
+        self.r_ref, self.v_ref, self.t_ref = r_ref, v_ref, t_ref
+        self.tol, self.max_iter = tol, max_iter
+        r0 = np.sqrt(np.einsum('ij,ij->i', r_ref, r_ref))
+        a = 1 / (2 / r0 - np.einsum('ij,ij->i', v_ref, v_ref) / mu)
+        if np.any(a <= 0):
+            raise ValueError("Дрейф Кеплера поддерживает только эллиптические орбиты")
+        self.a = a
+        self.a_r0 = a / r0
+        self.n = np.sqrt(mu / a**3)
+        self.e_cos = 1 - r0 / a
+        self.e_sin = np.einsum('ij,ij->i', r_ref, v_ref) / np.sqrt(mu * a)
+        self._t = t_ref
+        self._dM = np.zeros(r0.size)
+        self._x = np.zeros(r0.size)
+        self._dx_dM = 1 / (1 - self.e_cos)
+        self._rho = r_ref
+        self.radius = r0
+
+    def __call__(self, t):
+        # Конец шага решатель получает как t + h, а событию передает t_new -
+        # они могут отличаться в последнем знаке
+        if abs(t - self._t) <= 4 * math.ulp(t):
+            return self._rho
+        dt = t - self.t_ref
+        # Целые обороты убираются, как в kepler_drift
+        turns = np.floor(self.n * dt / (2 * np.pi))
+        dt_red = dt - 2 * np.pi * turns / self.n
+        dM = self.n * dt_red
+
+        step = dM - self._dM
+        if np.abs(step).max() < 1:
+            x = self._x + step * self._dx_dM
+        else:
+            # После большого скачка (или перехода через целый оборот) прогноз
+            # ненадежен - начальное приближение то же, что в kepler_drift
+            x = dM.copy()
+        for _ in range(self.max_iter):
+            sin_x, cos_x = np.sin(x), np.cos(x)
+            fprime = 1 - self.e_cos * cos_x + self.e_sin * sin_x
+            dx = (x - self.e_cos * sin_x + self.e_sin * (1 - cos_x) - dM) / fprime
+            x -= dx
+            # Ошибка после шага Ньютона порядка квадрата поправки
+            if dx @ dx <= self.tol:
+                break
+
+        sin_x, cos_x = np.sin(x), np.cos(x)
+        fprime = 1 - self.e_cos * cos_x + self.e_sin * sin_x
+        f = 1 - self.a_r0 * (1 - cos_x)
+        g = dt_red + (sin_x - x) / self.n
+        self._t, self._dM, self._x, self._dx_dM = t, dM, x, 1 / fprime
+        self._rho = f[:, None] * self.r_ref + g[:, None] * self.v_ref
+        # |rho| = a (1 - e cos E) - производная уравнения Кеплера, умноженная на a
+        self.radius = self.a * fprime
+        return self._rho
+
+def solve_encke(accel, t_span, y0, t_eval, rtol, method='RK45', rectify=ENCKE_RECTIFY, mu=GM_sun):
+    """
+    Интегрирует движение N тел методом Энке: интегрируются только отклонения
+    от опорных кеплеровых орбит вокруг Солнца, а сами опорные орбиты
+    вычисляются точно. Когда отклонение какого-либо тела превышает долю
+    rectify от его гелиоцентрического расстояния, опорная орбита заменяется
+    оскулирующей (ректификация).
+
+    Параметры:
+        accel:   функция возмущающих ускорений accel(r) для позиций (N, 3)
+                 (без притяжения Солнца).
+        t_span, y0, t_eval: как в solve_ivp.
+        rtol:    относительная точность. Абсолютная точность для отклонений
+                 берется от масштаба гелиоцентрических векторов, чтобы
+                 точность совпадала с гелиоцентрическим интегрированием.
+        method:  метод solve_ivp для уравнений отклонений.
+        rectify: порог ректификации |delta_r| / |rho|.
+
+    Возвращает:
+        OptimizeResult с полями t, y (6N, len(t)), nfev и n_rectifications
+        (при сбое решателя - только до последней посчитанной точки t_eval).
+    """
+    t_eval = np.asarray(t_span if t_eval is None else t_eval, dtype=float)
+    state = np.asarray(y0, dtype=float).reshape(-1, 6)
+    y = np.empty((state.size, t_eval.size))
+
+    t0 = t_span[0]
+    filled = 0
+    nfev = 0
+    n_rectifications = 0
+    while True:
+        r_ref = state[:, :3].copy()
+        v_ref = state[:, 3:].copy()
+        t_ref = t0
+        reference = _ReferenceOrbits(r_ref, v_ref, t_ref, mu)
+
+        def rhs(t, delta):
+            d = delta.reshape(-1, 6)
+            rho = reference(t)
+            r = rho + d[:, :3]
+            q = np.einsum('ij,ij->i', d[:, :3], d[:, :3] - 2 * r) / np.einsum('ij,ij->i', r, r)
+            rho3 = reference.radius**3
+            dd = np.empty_like(d)
+            dd[:, :3] = d[:, 3:]
+            dd[:, 3:] = -(mu / rho3)[:, None] * (d[:, :3] + _battin_f(q)[:, None] * r) + accel(r)
+            return dd.ravel()
+
+        def rectification_event(t, delta):
+            d = delta.reshape(-1, 6)
+            reference(t)
+            return np.max(np.linalg.norm(d[:, :3], axis=1) / reference.radius) - rectify
+
+        rectification_event.terminal = True
+        rectification_event.direction = 1
+
+        scale = np.hstack([
+            np.repeat(np.linalg.norm(r_ref, axis=1), 3).reshape(-1, 3),
+            np.repeat(np.linalg.norm(v_ref, axis=1), 3).reshape(-1, 3),
+        ]).ravel()
+
+        segment = solve_ivp(rhs, (t0, t_span[1]), np.zeros(state.size), method=method, t_eval=t_eval[filled:],
+                            rtol=rtol, atol=rtol * scale, events=rectification_event)
+        nfev += segment.nfev
+
+        m = segment.t.size
+        if m:
+            y[:, filled:filled + m] = segment.y + _reference_states(r_ref, v_ref, segment.t - t_ref, mu)
+            filled += m
+
+        if segment.status != 1:
+            break
+
+        # Ректификация: новая опорная орбита - оскулирующая в момент события
+        t0 = segment.t_events[0][0]
+        state = (segment.y_events[0][0]
+                 + _reference_states(r_ref, v_ref, np.array([t0 - t_ref]), mu)[:, 0]).reshape(-1, 6)
+        n_rectifications += 1
+
+    # При сбое решателя возвращаются только заполненные точки, как у solve_ivp
+    return OptimizeResult(t=t_eval[:filled], y=y[:, :filled], nfev=nfev, njev=0, nlu=0, n_rectifications=n_rectifications,
+                          status=segment.status, success=segment.success, message=segment.message)
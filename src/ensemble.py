@@ -0,0 +1,135 @@
+import functools
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from diff_equation_solver import make_equations_of_motion, solve_orbits
+from global_consts import GM_sun, AU_IN_METERS, BODY_MASSES, BODY_MASSLESS, INTEGRATOR, rtol_val, atol_val, ENSEMBLE_BATCH_SIZE, ESCAPE_DELTA_A
+
+def sample_clones(y0, cov, n_clones, body=1, seed=None):
+    """
+    Генерирует клоны тела с нормальным разбросом начального состояния.
+
+    Параметры:
+        y0 (ndarray):  Начальный вектор состояния системы длины 6N.
+        cov (ndarray): Ковариационная матрица (6, 6) положения и скорости тела.
+        n_clones (int): Число клонов.
+        body (int):    Индекс тела в векторе состояния (по умолчанию Круитни).
+        seed:          Зерно генератора случайных чисел.
+
+    Возвращает:
+        ndarray (n_clones, 6) начальных состояний клонов.
+    """
+    rng = np.random.default_rng(seed)
+    mean = np.asarray(y0, dtype=float).reshape(-1, 6)[body]
+    return rng.multivariate_normal(mean, cov, size=n_clones)
+
+def pack_clones(y0, clones, masses=BODY_MASSES, massless=BODY_MASSLESS):
+    """
+    Добавляет клоны в систему как безмассовые частицы, чтобы
+    проинтегрировать их одним вызовом solve_orbits.
+
+    Возвращает:
+        (y, masses, massless) - расширенные вектор состояния, массы и маску.
+    """
+    n_clones = len(clones)
+    y = np.concatenate([np.asarray(y0, dtype=float), np.asarray(clones, dtype=float).ravel()])
+    masses = np.concatenate([masses, np.zeros(n_clones)])
+    massless = np.concatenate([massless, np.ones(n_clones, dtype=bool)])
+    return y, masses, massless
+
+def _semi_major_axis(states):
+    """Большая полуось по энергии для состояний (..., 6, T)."""
+    r = np.linalg.norm(states[..., :3, :], axis=-2)
+    v2 = np.sum(states[..., 3:, :]**2, axis=-2)
+    return 1 / (2 / r - v2 / GM_sun)
+
+def propagate_batch(y0, clones, t_span, t_eval, method=INTEGRATOR, reference=0,
+                    masses=BODY_MASSES, massless=BODY_MASSLESS, escape_delta_a=ESCAPE_DELTA_A,
+                    rtol=rtol_val, atol=atol_val):
+    """
+    Интегрирует пакет клонов вместе с массивными телами и возвращает
+    только сводную статистику, а не полные траектории.
+
+    Клон считается покинувшим коорбитальный режим, если его большая полуось
+    хотя бы раз отличается от большой полуоси тела reference более чем
+    на escape_delta_a а.е.
+
+    Возвращает:
+        словарь с числом клонов, покомпонентными по времени минимумом,
+        максимумом, суммой и суммой квадратов расстояний до тела reference
+        (в метрах) и числом "сбежавших" клонов.
+    """
+    n_bodies = len(masses)
+    y, masses, massless = pack_clones(y0, clones, masses, massless)
+    rhs = make_equations_of_motion(masses, massless)
+    solution = solve_orbits(rhs, t_span, y, t_eval, method=method, masses=masses, massless=massless,
+                            rtol=rtol, atol=atol)
+
+    states = solution.y.reshape(-1, 6, solution.y.shape[1])
+    clone_states = states[n_bodies:]
+    distances = np.linalg.norm(clone_states[:, :3, :] - states[reference, :3, :], axis=1)
+
+    delta_a = np.abs(_semi_major_axis(clone_states) - _semi_major_axis(states[reference]))
+    escaped = np.any(delta_a > escape_delta_a * AU_IN_METERS, axis=1)
+
+    return {
+        'count': len(clones),
+        'dist_min': distances.min(axis=0),
+        'dist_max': distances.max(axis=0),
+        'dist_sum': distances.sum(axis=0),
+        'dist_sq_sum': np.sum(distances**2, axis=0),
+        'escaped': int(escaped.sum()),
+    }
+
+def run_ensemble(y0, cov, n_clones, t_span, t_eval, body=1, reference=0, method=INTEGRATOR,
+                 batch_size=ENSEMBLE_BATCH_SIZE, max_workers=None, seed=None, masses=BODY_MASSES,
+                 massless=BODY_MASSLESS, rtol=rtol_val, atol=atol_val):
+    """
+    Распространяет ансамбль клонов тела body: клоны упаковываются пакетами
+    по batch_size безмассовых частиц, пакеты считаются параллельно в пуле
+    процессов. В родительский процесс возвращается только статистика.
+
+    Параметры:
+        y0, cov, n_clones, body, seed: см. sample_clones.
+        t_span, t_eval, method, rtol, atol: см. solve_orbits.
+        masses, massless:  Массы тел системы y0 и маска пробных частиц
+                           (по умолчанию - Земля и Круитни).
+        reference (int):   Индекс тела, расстояние до которого отслеживается (Земля).
+        batch_size (int):  Число клонов в одном интегрировании.
+        max_workers (int): Число процессов (1 - считать в текущем процессе).
+
+    Возвращает:
+        словарь с огибающими расстояния до тела reference (в метрах) -
+        distance_min, distance_max, distance_mean, distance_std - и долей
+        клонов, покинувших коорбитальный режим (escape_fraction).
+    """
+    if n_clones < 1 or batch_size < 1:
+        raise ValueError(f"Число клонов и размер пакета должны быть положительными: {n_clones}, {batch_size}")
+    if np.size(y0) != 6 * len(masses) or len(massless) != len(masses):
+        raise ValueError(f"Массы ({len(masses)}) и маска ({len(massless)}) не соответствуют "
+                         f"вектору состояния длины {np.size(y0)}")
+
+    clones = sample_clones(y0, cov, n_clones, body, seed)
+    batches = [clones[k:k + batch_size] for k in range(0, n_clones, batch_size)]
+    task = functools.partial(propagate_batch, y0, t_span=t_span, t_eval=t_eval, method=method,
+                             reference=reference, masses=masses, massless=massless, rtol=rtol, atol=atol)
+
+    if max_workers == 1:
+        summaries = [task(batch) for batch in batches]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            summaries = list(executor.map(task, batches))
+
+    count = sum(s['count'] for s in summaries)
+    dist_sum = sum(s['dist_sum'] for s in summaries)
+    dist_sq_sum = sum(s['dist_sq_sum'] for s in summaries)
+    mean = dist_sum / count
+
+    return {
+        't': np.asarray(t_eval),
+        'n_clones': count,
+        'distance_min': np.min([s['dist_min'] for s in summaries], axis=0),
+        'distance_max': np.max([s['dist_max'] for s in summaries], axis=0),
+        'distance_mean': mean,
+        'distance_std': np.sqrt(np.maximum(dist_sq_sum / count - mean**2, 0)),
+        'escape_fraction': sum(s['escaped'] for s in summaries) / count,
+    }
@@ -0,0 +1,147 @@
+import numpy as np
+from scipy.optimize import brentq
+from global_consts import HILL_RADIUS_EARTH, EVENT_SUBSTEPS
+
+# Индексы тел в векторе состояния по умолчанию: Земля и Круитни
+EARTH = 0
+CRUITHNE = 1
+
+def _relative(y, earth, body):
+    """Относительные положение и скорость тела body относительно earth."""
+    dr = y[6 * body:6 * body + 3] - y[6 * earth:6 * earth + 3]
+    dv = y[6 * body + 3:6 * body + 6] - y[6 * earth + 3:6 * earth + 6]
+    return dr, dv
+
+def close_approach_event(earth=EARTH, body=CRUITHNE, terminal=False):
+    """
+    Событие минимума расстояния тела до Земли: производная квадрата
+    расстояния (dr . dv) меняет знак с минуса на плюс.
+    """
+    def event(t, y):
+        dr, dv = _relative(y, earth, body)
+        return np.sum(dr * dv, axis=0)
+
+    event.terminal = terminal
+    event.direction = 1
+    event.name = 'close_approach'
+    return event
+
+def relative_longitude_event(earth=EARTH, body=CRUITHNE, terminal=False):
+    """
+    Событие смены знака относительной долготы тела во вращающейся вместе
+    с Землей системе (соединение или противостояние с Землей).
+    """
+    def event(t, y):
+        # z-компонента [r_earth x r_body] имеет знак sin(lambda_body - lambda_earth)
+        xE, yE = y[6 * earth], y[6 * earth + 1]
+        xB, yB = y[6 * body], y[6 * body + 1]
+        return xE * yB - yE * xB
+
+    event.terminal = terminal
+    event.direction = 0
+    event.name = 'longitude_crossing'
+    return event
+
+def hill_sphere_event(earth=EARTH, body=CRUITHNE, radius=HILL_RADIUS_EARTH, terminal=False):
+    """Событие входа тела в сферу Хилла Земли."""
+    def event(t, y):
+        dr, _ = _relative(y, earth, body)
+        return np.sqrt(np.sum(dr**2, axis=0)) - radius
+
+    event.terminal = terminal
+    event.direction = -1
+    event.name = 'hill_entry'
+    return event
+
+def default_events(earth=EARTH, body=CRUITHNE):
+    """Набор событий для анализа подковообразной орбиты Круитни."""
+    return [close_approach_event(earth, body),
+            relative_longitude_event(earth, body),
+            hill_sphere_event(earth, body)]
+
+def find_events(trajectory, events, t_grid=None):
+    """
+    Ищет события по непрерывной траектории (Trajectory) без повторного
+    интегрирования: смена знака функции события на сетке t_grid (по умолчанию -
+    узлы шагов интегратора) уточняется методом Брента.
+
+    Возвращает:
+        (t_events, y_events) - списки массивов в формате solve_ivp.
+    """
+    if t_grid is None:
+        t_grid = getattr(trajectory, 't_nodes', None)
+    if t_grid is None:
+        t_grid = np.linspace(trajectory.t_min, trajectory.t_max, 4 * trajectory.n_steps + 1)
+    y_grid = trajectory(t_grid)
+
+    t_events, y_events = [], []
+    for event in events:
+        g = event(t_grid, y_grid)
+        direction = getattr(event, 'direction', 0)
+        up = (g[:-1] < 0) & (g[1:] >= 0)
+        down = (g[:-1] > 0) & (g[1:] <= 0)
+        if direction > 0:
+            crossings = np.flatnonzero(up)
+        elif direction < 0:
+            crossings = np.flatnonzero(down)
+        else:
+            crossings = np.flatnonzero(up | down)
+
+        times = np.array([brentq(lambda t: event(t, trajectory(t)), t_grid[k], t_grid[k + 1])
+                          for k in crossings])
+        t_events.append(times)
+        y_events.append(trajectory(times).T if times.size else np.empty((0, y_grid.shape[0])))
+
+    return t_events, y_events
+
+def substep_grid(t_nodes, substeps=EVENT_SUBSTEPS):
+    """Сетка для find_events: каждый шаг между узлами t_nodes делится на substeps равных частей."""
+    t_nodes = np.asarray(t_nodes, dtype=float)
+    fractions = np.arange(substeps) / substeps
+    grid = t_nodes[:-1, None] + np.diff(t_nodes)[:, None] * fractions
+    return np.append(grid.ravel(), t_nodes[-1])
+
+def stop_at_terminal(solution, events):
+    """
+    Обрезает решение (поля t, y, t_events, y_events) в момент первого
+    события с признаком terminal, как это делает solve_ivp.
+    """
+    stops = [times[0] for event, times in zip(events, solution.t_events)
+             if getattr(event, 'terminal', False) and times.size]
+    if not stops:
+        return solution
+    t_stop = min(stops)
+    keep = solution.t <= t_stop
+    solution.t = solution.t[keep]
+    solution.y = solution.y[:, keep]
+    for n, times in enumerate(solution.t_events):
+        solution.t_events[n] = times[times <= t_stop]
+        solution.y_events[n] = solution.y_events[n][:times[times <= t_stop].size]
+    solution.status = 1
+    solution.message = 'A termination event occurred.'
+    return solution
+
+def event_table(solution, events, earth=EARTH, body=CRUITHNE):
+    """
+    Собирает найденные события в компактную таблицу.
+
+    Параметры:
+        solution: решение с полями t_events и y_events (solve_orbits с events).
+        events:   список функций событий, переданный в solve_orbits.
+
+    Возвращает:
+        pandas.DataFrame со столбцами event, t (с), distance (м),
+        rel_velocity (м/с), отсортированный по времени.
+    """
+    import pandas as pd
+
+    rows = []
+    for event, times, states in zip(events, solution.t_events, solution.y_events):
+        name = getattr(event, 'name', event.__name__)
+        for t, y in zip(times, states):
+            dr, dv = _relative(y, earth, body)
+            rows.append({'event': name, 't': t,
+                         'distance': np.linalg.norm(dr), 'rel_velocity': np.linalg.norm(dv)})
+
+    table = pd.DataFrame(rows, columns=['event', 't', 'distance', 'rel_velocity'])
+    return table.sort_values('t', ignore_index=True)
@@ -1,32 +1,310 @@
-import pandas as pd
-from astroquery.jplhorizons import Horizons
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from global_consts import (CACHE_DIR, CACHE_TTL, CACHE_MAX_ENTRIES, OFFLINE, AU_IN_METERS, FIXTURE_DIR,
+                           julian_date_from_iso, FETCH_WORKERS, FETCH_EPOCH_BATCH, FETCH_RETRIES, FETCH_BACKOFF)
 
-def get_orbital_elements(object_id, epochs=None):
+class HorizonsProvider:
+    """Получает орбитальные элементы и векторы состояния из базы JPL Horizons через astroquery."""
+    uses_network = True
+
+    def elements(self, object_id, epochs, location):
+        # astroquery импортируется только при реальном обращении к сети
+        from astroquery.jplhorizons import Horizons
+
+        obj = Horizons(id=object_id, location=location, epochs=epochs)
+        return obj.elements().to_pandas()
+
+    def vectors(self, object_id, epochs, location):
+        from astroquery.jplhorizons import Horizons
+
+        obj = Horizons(id=object_id, location=location, epochs=epochs)
+        return obj.vectors(refplane='ecliptic').to_pandas()
+
+class FixtureProvider:
+    """
+    Читает записанные ответы из локальных JSON-файлов elements_<object_id>.json
+    и vectors_<object_id>.json (формат pandas orient='split').
+    Используется для тестов и пакетных задач без доступа к сети.
+    """
+    uses_network = False
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def elements(self, object_id, epochs, location):
+        return self._read('elements', object_id, epochs)
+
+    def vectors(self, object_id, epochs, location):
+        return self._read('vectors', object_id, epochs)
+
+    def _read(self, kind, object_id, epochs):
+        import pandas as pd
+
+        path = os.path.join(self.directory, f'{kind}_{object_id}.json')
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Нет локальных данных для объекта {object_id}: {path}")
+        df = pd.read_json(path, orient='split')
+
+        # Выбираем запрошенные эпохи (юлианские даты или строки 'YYYY-MM-DD')
+        # в порядке запроса; эпох, которых нет в файле, быть не должно
+        if isinstance(epochs, dict):
+            jd = df['datetime_jd']
+            return df[(jd >= _julian_date(epochs['start'])) & (jd <= _julian_date(epochs['stop']))].reset_index(drop=True)
+        epochs = list(epochs) if isinstance(epochs, (list, tuple)) else [epochs]
+        requested = [_julian_date(epoch) for epoch in epochs]
+        rows = {jd: n for n, jd in enumerate(df['datetime_jd'])}
+        missing = [epoch for epoch, jd in zip(epochs, requested) if jd not in rows]
+        if missing:
+            raise ValueError(f"В локальных данных {path} нет эпох {missing}")
+        return df.iloc[[rows[jd] for jd in requested]].reset_index(drop=True)
+
+def _julian_date(epoch):
+    return float(epoch) if isinstance(epoch, (int, float, np.number)) else julian_date_from_iso(str(epoch))
+
+class ElementsCache:
+    """
+    Дисковый кэш ответов JPL Horizons. Ключ - (object_id, epochs, location),
+    записи хранятся в JSON, устаревают через ttl секунд и вытесняются
+    по давности использования, если их больше max_entries.
+    """
+
+    def __init__(self, directory=CACHE_DIR, ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # Кэшем пользуются одновременно потоки fetch_states
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(object_id, epochs, location, kind='elements'):
+        fields = [str(object_id), epochs, location]
+        # Ключи элементов совпадают с записанными ранее
+        if kind != 'elements':
+            fields.append(kind)
+        raw = json.dumps(fields, default=str, sort_keys=True)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.json')
+
+    def get(self, key, allow_stale=False):
+        """
+        Запись по ключу или None. Устаревшая запись удаляется, а при
+        allow_stale=True (офлайн-режим, когда обновить ее неоткуда)
+        возвращается с предупреждением и остается в кэше.
+        """
+        path = self._path(key)
+        with self._lock:
+            if not os.path.exists(path):
+                return None
+            age = time.time() - os.path.getmtime(path)
+            if self.ttl is not None and age > self.ttl:
+                if not allow_stale:
+                    os.remove(path)
+                    return None
+                print(f"Запись кэша {key[:12]} устарела ({age / 86400:.0f} сут.), используется в офлайн-режиме")
+            with open(path, encoding='utf-8') as f:
+                record = json.load(f)
+            # Обновляем время доступа для вытеснения давно неиспользуемых записей
+            os.utime(path, (time.time(), record['created']))
+        import pandas as pd
+
+        data = record['data']
+        return pd.DataFrame(data['data'], index=data['index'], columns=data['columns'])
+
+    def put(self, key, df):
+        os.makedirs(self.directory, exist_ok=True)
+        # По умолчанию to_json округляет до 10 значащих цифр (метры в координатах)
+        record = {'created': time.time(), 'data': json.loads(df.to_json(orient='split', double_precision=15))}
+        path = self._path(key)
+        tmp_path = f'{path}.tmp'
+        with self._lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(record, f)
+            os.replace(tmp_path, path)
+            self.evict()
+
+    def evict(self):
+        entries = [os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                   if name.endswith('.json')]
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(key=os.path.getatime)
+        for path in entries[:len(entries) - self.max_entries]:
+            os.remove(path)
+
+_provider = FixtureProvider(FIXTURE_DIR) if FIXTURE_DIR else HorizonsProvider()
+_cache = ElementsCache()
+
+def set_provider(provider):
+    """
+    Заменяет источник орбитальных элементов (например, на FixtureProvider).
+    По умолчанию источник - JPL Horizons или FixtureProvider(FIXTURE_DIR),
+    если задана переменная окружения VPV_FIXTURE_DIR.
+    """
+    global _provider
+    _provider = provider
+
+def get_orbital_elements(object_id, epochs=None, location='@sun', provider=None, cache=None, offline=OFFLINE):
     """
     Получает орбитальные элементы объекта по его ID из базы JPL Horizons
     и сохраняет в pandas DataFrame.
-    
+
     Параметры:
         object_id: int or str
             ID объекта в базе JPL Horizons.
         epochs: list or str
             Список дат в юлианских днях или диапазон.
-            
+        location: str
+            Центр системы координат.
+        provider:
+            Источник данных (по умолчанию - установленный через set_provider).
+        cache: ElementsCache or False
+            Дисковый кэш (по умолчанию - общий кэш, False - без кэша).
+            Ответы источников без сети (FixtureProvider) не кэшируются.
+        offline: bool
+            Не обращаться к сети: данные берутся только из кэша
+            или из локального источника.
+
     Возвращает:
         pandas.DataFrame с орбитальными элементами и другой полезной информацией.
     """
+    return _query('elements', object_id, epochs, location, provider, cache, offline)
+
+def get_state_vectors(object_id, epochs=None, location='@sun', provider=None, cache=None, offline=OFFLINE):
+    """
+    Получает векторы состояния объекта (x, y, z в а.е., vx, vy, vz в а.е./сутки,
+    эклиптика) из базы JPL Horizons. Параметры как у get_orbital_elements.
+
+    Возвращает:
+        pandas.DataFrame с векторами состояния.
+    """
+    return _query('vectors', object_id, epochs, location, provider, cache, offline)
+
+def _query(kind, object_id, epochs, location, provider, cache, offline,
+           retries=FETCH_RETRIES, backoff=FETCH_BACKOFF):
+    """Запрос kind ('elements' или 'vectors') через кэш с повторами при ошибках сети."""
     if epochs is None:
         # Задаем дату по умолчанию, если не указаны эпохи
         epochs = ['2024-01-01']
-    
-    # Создаем запрос в JPL Horizons для объекта
-    obj = Horizons(id=object_id, location='@sun', epochs=epochs)
-    
-    # Получаем орбитальные элементы и другую информацию
-    try:
-        elements = obj.elements()
-        df = elements.to_pandas()
-    except Exception as e:
-        raise ValueError(f"Ошибка при выполнении запроса: {e}")
-    
+    if provider is None:
+        provider = _provider
+    if cache is None:
+        cache = _cache
+    # Кэшируются только ответы сети: данные локальных источников не должны
+    # попадать в общий кэш и подменять ответы JPL Horizons
+    if not provider.uses_network:
+        cache = False
+
+    if cache:
+        key = cache.key(object_id, epochs, location, kind)
+        df = cache.get(key, allow_stale=offline)
+        if df is not None:
+            return df
+
+    if offline and provider.uses_network:
+        raise ValueError(f"Нет данных в кэше для объекта {object_id}, а офлайн-режим запрещает запрос к сети")
+
+    # Получаем данные; при сбоях сети запрос повторяется с экспоненциальной паузой,
+    # остальные ошибки (неверный ID, нет локального файла) сообщаются сразу
+    attempts = retries + 1 if provider.uses_network else 1
+    for attempt in range(attempts):
+        try:
+            df = getattr(provider, kind)(object_id, epochs, location)
+            break
+        except Exception as e:
+            if attempt == attempts - 1 or not isinstance(e, _transient_errors()):
+                raise ValueError(f"Ошибка при выполнении запроса: {e}") from e
+            time.sleep(backoff * 2**attempt)
+
+    if cache:
+        cache.put(key, df)
+
     return df
+
+def _transient_errors():
+    """Типы ошибок сети, после которых запрос имеет смысл повторить."""
+    errors = (ConnectionError, TimeoutError)
+    try:
+        import requests
+    except ImportError:
+        return errors
+    return errors + (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+def _epoch_batches(epochs, batch_size):
+    # Длинные списки эпох разбиваются на несколько запросов; диапазон - один запрос
+    if isinstance(epochs, (list, tuple)):
+        return [list(epochs[i:i + batch_size]) for i in range(0, len(epochs), batch_size)]
+    return [epochs]
+
+def states_from_frames(kind, frames):
+    """
+    Переводит ответы fetch_frames в векторы состояния.
+
+    Возвращает:
+        массив (N, 6, E) в м и м/с.
+    """
+    states = []
+    for df in frames:
+        if kind == 'vectors':
+            r = df[['x', 'y', 'z']].to_numpy(dtype=float) * AU_IN_METERS
+            v = df[['vx', 'vy', 'vz']].to_numpy(dtype=float) * AU_IN_METERS / 86400
+        else:
+            from translation import elements_to_vectors
+
+            r, v = elements_to_vectors(df)
+        states.append(np.hstack([r, v]).T)
+    if len({state.shape for state in states}) != 1:
+        raise ValueError(f"Для объектов получено разное число эпох: {[state.shape[1] for state in states]}")
+    return np.stack(states)
+
+def fetch_frames(object_ids, epochs, location='@sun', kind='vectors', provider=None, cache=None,
+                 offline=OFFLINE, max_workers=FETCH_WORKERS, epoch_batch=FETCH_EPOCH_BATCH,
+                 retries=FETCH_RETRIES, backoff=FETCH_BACKOFF):
+    """
+    Параллельно получает ответы JPL Horizons для нескольких объектов на список
+    эпох. Каждый объект и каждая группа из epoch_batch эпох запрашиваются
+    отдельно в пуле из max_workers потоков (с кэшем и повторами).
+
+    Параметры:
+        object_ids: ID объектов в базе JPL Horizons.
+        epochs, location, provider, cache, offline: как у get_orbital_elements.
+        kind: 'vectors' - векторы состояния, 'elements' - орбитальные элементы.
+        retries, backoff: число повторов при сбоях сети и начальная пауза в секундах.
+
+    Возвращает:
+        список DataFrame (по одному на объект, эпохи всех групп подряд).
+    """
+    if kind not in ('vectors', 'elements'):
+        raise ValueError(f"Неизвестный тип запроса: {kind}")
+    import pandas as pd
+
+    batches = _epoch_batches(epochs, epoch_batch)
+    jobs = [(object_id, batch) for object_id in object_ids for batch in batches]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        frames = list(executor.map(
+            lambda job: _query(kind, job[0], job[1], location, provider, cache, offline, retries, backoff), jobs))
+
+    return [pd.concat(frames[i:i + len(batches)], ignore_index=True)
+            for i in range(0, len(frames), len(batches))]
+
+def fetch_states(object_ids, epochs, location='@sun', kind='vectors', **kwargs):
+    """
+    Параллельно получает состояния нескольких объектов на список эпох
+    (fetch_frames и states_from_frames вместе).
+
+    Параметры:
+        kind: 'vectors' - запрашивать векторы состояния напрямую,
+              'elements' - запрашивать элементы и переводить их в векторы.
+        остальные - как у fetch_frames.
+
+    Возвращает:
+        массив (N, 6, E) в м и м/с; начальное состояние для solve_orbits -
+        states[:, :, 0].ravel().
+    """
+    return states_from_frames(kind, fetch_frames(object_ids, epochs, location, kind, **kwargs))
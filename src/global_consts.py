@@ -1,5 +1,6 @@
+import os
+from datetime import datetime
 import numpy as np
-from astropy.time import Time
 
 # Гравитационная постоянная
 G = 6.67430e-11  # м^3/(кг*с^2)
@@ -16,12 +17,29 @@ M_jupiter = 1.89813e27  # масса Юпитера в кг
 M_saturn = 5.68319e26  # масса Сатурна в кг
 m_hector = 2.6e18
 
+# Массы тел по их ID в базе JPL Horizons
+MASSES_BY_ID = {
+    "399": M_earth,
+    "3753": m_cruithne,
+    "599": M_jupiter,
+    "699": M_saturn,
+    "624": m_hector,
+}
+
 # 1 астрономическая единица в метрах
 AU_IN_METERS = 149597870700
 
 GM_sun = G * M_sun  # Гравитационный параметр Солнца (м^3/с^2)
 GM_earth = G * M_earth   # Гравитационный параметр Земли в м^3/с^2
 
+# Радиус сферы Хилла Земли в метрах
+HILL_RADIUS_EARTH = AU_IN_METERS * (M_earth / (3 * M_sun)) ** (1 / 3)
+
+# Массы тел в порядке их расположения в векторе состояния (Земля, Круитни)
+BODY_MASSES = np.array([M_earth, m_cruithne])
+# Безмассовые тела (пробные частицы) не притягивают остальные тела
+BODY_MASSLESS = np.array([False, True])
+
 
 date = '2000-01-01'
 delta_t = 600   # years
@@ -30,9 +48,40 @@ VECTORS_NUM = 40000
 rtol_val = 1e-12
 atol_val = 1e-18
 
+# Метод интегрирования: 'RK45' (или другой метод solve_ivp), 'leapfrog', 'yoshida4', 'wisdom_holman', 'encke'
+INTEGRATOR = 'RK45'
+# Шаги симплектических интеграторов по умолчанию в секундах (для каждой схемы свой).
+# Ошибки за 10 лет для Земли и Круитни (benchmark.py, эталон DOP853):
+# - wisdom_holman: кеплеровский дрейф точный, ошибка шага мала (порядка масс планет),
+#   при 4 сутках ошибка позиции ~7e-8 а.е., энергии ~1e-14 - быстрее RK45;
+# - yoshida4: притяжение Солнца тоже аппроксимируется, при 1 сутках ~1e-4 а.е.,
+#   энергии ~3e-9;
+# - leapfrog: 2-й порядок, при 12 часах ~3e-3 а.е., энергии ~1e-6 - для быстрых
+#   грубых оценок, для точных расчетов нужен wisdom_holman или методы solve_ivp.
+SYMPLECTIC_STEPS = {
+    'leapfrog': 12 * 3600,
+    'yoshida4': 24 * 3600,
+    'wisdom_holman': 4 * 24 * 3600,
+}
+# Реализация правой части для методов solve_ivp: 'auto' - скомпилированное ядро
+# Numba, если она установлена (иначе NumPy), 'numpy' - всегда NumPy
+RHS_BACKEND = 'auto'
+# Порог ректификации метода Энке: отклонение от опорной орбиты / гелиоцентрическое расстояние
+ENCKE_RECTIFY = 0.01
+# Число точек поиска событий на один шаг решателя solve_ivp: смена знака ищется
+# между ними, поэтому два корня внутри одного длинного шага не теряются
+EVENT_SUBSTEPS = 8
+
+def julian_date_from_iso(iso_date):
+    """
+    Юлианская дата для строки 'YYYY-MM-DD' или 'YYYY-MM-DD HH:MM:SS' (UTC)
+    без импорта astropy - совпадает с Time(iso_date, format='iso').jd.
+    """
+    moment = datetime.fromisoformat(iso_date)
+    return 2451544.5 + (moment - datetime(2000, 1, 1)).total_seconds() / 86400
+
 # Преобразуем в юлианскую дату
-t = Time(date, format='iso')
-julian_date = t.jd
+julian_date = julian_date_from_iso(date)
 
 
 epochs = [julian_date]  # Юлианская дата (или укажи строку даты '2024-01-01')
@@ -42,5 +91,41 @@ EARTH_ID = "399"  # ID земли 399
 # CRUITHNE_ID = "624"  # ID для астероида Круитни 3753
 # EARTH_ID = "699"  # ID земли 399
 
+# Контроль дрейфа энергии: период проверки в шагах и допустимая относительная ошибка
+MONITOR_EVERY = 100
+MONITOR_THRESHOLD = 1e-8
+
+# Число точек t_eval в одной части при поблочном интегрировании с записью на диск
+CHUNK_SIZE = 1000
+
+# Архив траекторий: допустимая ошибка квантования позиций (м) и скоростей (м/с)
+ARCHIVE_POSITION_TOL = 1e3
+ARCHIVE_VELOCITY_TOL = 1e-3
+
+# Ансамбли клонов: число клонов в одном интегрировании и порог выхода
+# из коорбитального режима по большой полуоси (в а.е.)
+ENSEMBLE_BATCH_SIZE = 32
+ESCAPE_DELTA_A = 0.01
+
+# Дисковый кэш ответов JPL Horizons
+CACHE_DIR = os.environ.get('VPV_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'vpv_horizons'))
+CACHE_TTL = 30 * 24 * 3600  # время жизни записи в секундах
+CACHE_MAX_ENTRIES = 1000
+# Офлайн-режим: не обращаться к JPL Horizons (данные только из кэша или локальных файлов)
+OFFLINE = os.environ.get('VPV_OFFLINE', '0') == '1'
+# Каталог записанных ответов (elements_<ID>.json, vectors_<ID>.json): если задан,
+# данные берутся из него вместо JPL Horizons (см. get_coordinates.FixtureProvider)
+FIXTURE_DIR = os.environ.get('VPV_FIXTURE_DIR')
+# Параллельные запросы к JPL Horizons: число потоков, эпох в одном запросе,
+# повторов при ошибке и начальная пауза перед повтором в секундах (удваивается)
+FETCH_WORKERS = 4
+FETCH_EPOCH_BATCH = 50
+FETCH_RETRIES = 3
+FETCH_BACKOFF = 1.0
+
 INTERVAL = 1
-FRAME_NUM = 80
\ No newline at end of file
+FRAME_NUM = 80
+RELATIVE_FRAME_STEP = 11  # шаг по точкам траектории между кадрами относительной орбиты
+
+# Офлайн-рендеринг анимаций: число кадров в одной задаче пула процессов
+RENDER_CHUNK = 100
\ No newline at end of file
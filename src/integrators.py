@@ -0,0 +1,166 @@
+import numpy as np
+from scipy.optimize import OptimizeResult
+from global_consts import GM_sun
+
+# Коэффициенты композиции Йошиды 4-го порядка
+_CBRT2 = 2 ** (1 / 3)
+_W1 = 1 / (2 - _CBRT2)
+_W0 = -_CBRT2 / (2 - _CBRT2)
+
+def kepler_drift(r, v, dt, mu=GM_sun, tol=1e-14, max_iter=50):
+    """
+    Точно переносит тела по кеплеровым орбитам вокруг центрального тела
+    на время dt (f- и g-функции Гаусса в эксцентрических аномалиях).
+
+    Параметры:
+        r (ndarray): Позиции тел, массив (N, 3) в метрах.
+        v (ndarray): Скорости тел, массив (N, 3) в м/с.
+        dt (float):  Шаг по времени в секундах.
+        mu (float):  Гравитационный параметр центрального тела.
+
+    Возвращает:
+        (r_new, v_new) - новые позиции и скорости, массивы (N, 3).
+    """
+    r0 = np.sqrt(np.einsum('ij,ij->i', r, r))
+    v2 = np.einsum('ij,ij->i', v, v)
+    rv = np.einsum('ij,ij->i', r, v)
+
+    a = 1 / (2 / r0 - v2 / mu)
+    if np.any(a <= 0):
+        raise ValueError("Дрейф Кеплера поддерживает только эллиптические орбиты")
+
+    n = np.sqrt(mu / a**3)
+    e_cos = 1 - r0 / a             # e*cos(E0)
+    e_sin = rv / np.sqrt(mu * a)   # e*sin(E0)
+
+    # Убираем целые обороты, чтобы не терять точность в g-функции
+    dM = n * dt
+    turns = np.floor(dM / (2 * np.pi))
+    dM = dM - 2 * np.pi * turns
+    dt_red = dt - 2 * np.pi * turns / n
+
+    # Метод Ньютона для приращения эксцентрической аномалии x
+    x = dM.copy()
+    active = np.ones(x.shape, dtype=bool)
+    for _ in range(max_iter):
+        xa = x[active]
+        f = xa - e_cos[active] * np.sin(xa) + e_sin[active] * (1 - np.cos(xa)) - dM[active]
+        fprime = 1 - e_cos[active] * np.cos(xa) + e_sin[active] * np.sin(xa)
+        dx = f / fprime
+        x[active] = xa - dx
+        active[active] = np.abs(dx) > tol
+        if not active.any():
+            break
+
+    sin_x = np.sin(x)
+    cos_x = np.cos(x)
+    r1 = a * (1 - e_cos * cos_x + e_sin * sin_x)
+
+    f = 1 - a / r0 * (1 - cos_x)
+    g = dt_red + (sin_x - x) / n
+    fdot = -np.sqrt(mu * a) * sin_x / (r1 * r0)
+    gdot = 1 - a / r1 * (1 - cos_x)
+
+    r_new = f[:, None] * r + g[:, None] * v
+    v_new = fdot[:, None] * r + gdot[:, None] * v
+    return r_new, v_new
+
+def leapfrog_step(r, v, h, accel):
+    """Шаг схемы "удар-дрейф-удар" (leapfrog, 2-й порядок)."""
+    v = v + 0.5 * h * accel(r)
+    r = r + h * v
+    v = v + 0.5 * h * accel(r)
+    return r, v
+
+def yoshida4_step(r, v, h, accel):
+    """Шаг композиции Йошиды 4-го порядка из трех шагов leapfrog."""
+    r, v = leapfrog_step(r, v, _W1 * h, accel)
+    r, v = leapfrog_step(r, v, _W0 * h, accel)
+    r, v = leapfrog_step(r, v, _W1 * h, accel)
+    return r, v
+
+def wisdom_holman_step(r, v, h, accel, mu=GM_sun):
+    """
+    Шаг отображения Уиздома-Холмана: точный кеплеровский дрейф вокруг
+    Солнца и удар взаимными возмущениями (accel не должна включать Солнце).
+    """
+    r, v = kepler_drift(r, v, 0.5 * h, mu)
+    v = v + h * accel(r)
+    r, v = kepler_drift(r, v, 0.5 * h, mu)
+    return r, v
+
+SYMPLECTIC_STEPPERS = {
+    'leapfrog': leapfrog_step,
+    'yoshida4': yoshida4_step,
+    'wisdom_holman': wisdom_holman_step,
+}
+
+def integrate_fixed_step(stepper, accel, t_span, y0, t_eval, step, dense_output=False):
+    """
+    Интегрирует систему N тел симплектической схемой с постоянным шагом.
+
+    Между соседними точками t_eval делается целое число равных шагов,
+    не превышающих step, поэтому решение попадает точно в t_eval.
+
+    Параметры:
+        stepper: функция шага (r, v, h, accel) -> (r, v).
+        accel:   функция ускорений accel(r) для массива позиций (N, 3).
+        t_span:  (t0, t1) интервал интегрирования в секундах.
+        y0:      начальный вектор состояния длины 6N.
+        t_eval:  моменты времени для сохранения решения (или None).
+        step:    максимальный шаг интегрирования в секундах.
+        dense_output: сохранить состояние после каждого шага
+                      (поля t_nodes и y_nodes).
+
+    Ускорения в конце шага повторно используются в начале следующего, поэтому
+    шаг leapfrog стоит одно вычисление accel, шаг Йошиды - три.
+
+    Возвращает:
+        OptimizeResult с полями t, y (6N, len(t)) и nfev (число вычислений
+        accel), как у solve_ivp.
+    """
+    if t_eval is None:
+        t_eval = np.append(np.arange(t_span[0], t_span[1], step), t_span[1])
+    t_eval = np.asarray(t_eval, dtype=float)
+
+    nfev = 0
+    last_r, last_a = None, None
+
+    def counted_accel(r):
+        # Последний удар шага и первый удар следующего (как и соседних шагов
+        # leapfrog в композиции Йошиды) вычисляются в одних и тех же позициях:
+        # шаги не меняют массивы на месте, поэтому достаточно сравнить объекты
+        nonlocal nfev, last_r, last_a
+        if r is last_r:
+            return last_a
+        nfev += 1
+        last_r, last_a = r, accel(r)
+        return last_a
+
+    state = np.asarray(y0, dtype=float).reshape(-1, 6)
+    r = state[:, :3].copy()
+    v = state[:, 3:].copy()
+
+    y = np.empty((state.size, t_eval.size))
+    t = t_span[0]
+    t_nodes = [t]
+    y_nodes = [state.ravel().copy()]
+    for k, t_out in enumerate(t_eval):
+        interval = t_out - t
+        n_steps = int(np.ceil(abs(interval) / step - 1e-9))
+        if n_steps:
+            h = interval / n_steps
+            for j in range(1, n_steps + 1):
+                r, v = stepper(r, v, h, counted_accel)
+                if dense_output:
+                    t_nodes.append(t + j * h)
+                    y_nodes.append(np.hstack([r, v]).ravel())
+        y[:, k] = np.hstack([r, v]).ravel()
+        t = t_out
+
+    result = OptimizeResult(t=t_eval, y=y, nfev=nfev, njev=0, nlu=0,
+                            status=0, success=True, message="Интегрирование завершено")
+    if dense_output:
+        result.t_nodes = np.array(t_nodes)
+        result.y_nodes = np.array(y_nodes).T
+    return result
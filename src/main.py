@@ -1,73 +1,119 @@
 import numpy as np
-from global_consts import EARTH_ID, CRUITHNE_ID, epochs, delta_t, VECTORS_NUM
-from get_coordinates import get_orbital_elements
-from translation import kepler_to_vectors
-from animation_3D import animate_relative_orbit, save_animation, plot_orbits, plot_distances
+from global_consts import EARTH_ID, CRUITHNE_ID, epochs, delta_t, VECTORS_NUM, INTEGRATOR
+from get_coordinates import fetch_frames, states_from_frames, set_provider, FixtureProvider
 from diff_equation_solver import solve_orbits, equations_of_motion, calculate_energy, calculate_angular_momentum
-import time
-
-def main():
-    start_time = time.time()
-
-    # Получение орбитальных элементов
-    earth_elements = get_orbital_elements(EARTH_ID, epochs)
-    cruithne_elements = get_orbital_elements(CRUITHNE_ID, epochs)
+from profiling import Profiler, profile_to_file
+import argparse
+from contextlib import nullcontext
+
+def main(headless=False, profile=None, dump=None, dump_backend='cprofile', trace_allocations=False):
+    """
+    Считает орбиты Земли и Круитни и строит графики. В режиме headless
+    (python main.py --headless) выполняются только вычисления, а matplotlib
+    и astropy не импортируются.
+
+    Параметры:
+        profile: путь JSON-отчета профилировщика (длительности фаз, число
+            вычислений правой части, шаги решателя, пиковая память).
+        dump: путь файла cProfile (или HTML pyinstrument, см. dump_backend).
+        trace_allocations: учитывать пик выделений Python через tracemalloc
+            (заметно замедляет счет).
+    """
+    profiler = Profiler(track_allocations=trace_allocations)
+    with profile_to_file(dump, dump_backend) if dump else nullcontext():
+        solution = _run(profiler, headless)
+    if profile:
+        profiler.write_json(profile)
+    return solution
+
+def _run(profiler, headless):
+    # Получение орбитальных элементов (параллельно для обоих тел)
+    with profiler.span('fetch'):
+        elements = fetch_frames([EARTH_ID, CRUITHNE_ID], epochs, kind='elements')
 
     # Преобразование Кеплеровых элементов в векторы
-    earth_r, earth_v = kepler_to_vectors(
-        earth_elements['a'][0], earth_elements['e'][0], earth_elements['incl'][0],
-        earth_elements['Omega'][0], earth_elements['w'][0], earth_elements['M'][0]
-    )
-
-    cruithne_r, cruithne_v = kepler_to_vectors(
-        cruithne_elements['a'][0], cruithne_elements['e'][0], cruithne_elements['incl'][0],
-        cruithne_elements['Omega'][0], cruithne_elements['w'][0], cruithne_elements['M'][0]
-    )
+    with profiler.span('kepler_to_vectors'):
+        states = states_from_frames('elements', elements)
 
-    y0 = np.concatenate([earth_r, earth_v, cruithne_r, cruithne_v])
+    y0 = states[:, :, 0].ravel()
 
     # Определение временного интервала и точек для вычислений
     t_span = (0, delta_t * 365.25 * 24 * 3600)
     t_eval = np.linspace(t_span[0], t_span[1], VECTORS_NUM)
 
     # Решение системы уравнений движения
-    solution = solve_orbits(equations_of_motion, t_span, y0, t_eval)
+    with profiler.span('solve_orbits'):
+        solution = solve_orbits(profiler.count_calls('equations_of_motion', equations_of_motion),
+                                t_span, y0, t_eval, method=profiler.solver_method(INTEGRATOR))
+    profiler.record_solver(solution, INTEGRATOR)
 
     earth_positions = solution.y[:3, :]
     cruithne_positions = solution.y[6:9, :]
 
-    end_time = time.time()
-
-    execution_time = end_time - start_time
+    execution_time = sum(profiler.spans[name]['seconds'] for name in ('fetch', 'kepler_to_vectors', 'solve_orbits'))
     print(f"Время выполнения: {execution_time:.2f} секунд")
 
-    # Анализ энергии
-    initial_energy = calculate_energy(y0)
-    final_energy = calculate_energy(solution.y[:, -1])
+    with profiler.span('diagnostics'):
+        # Анализ энергии
+        initial_energy = calculate_energy(y0)
+        final_energy = calculate_energy(solution.y[:, -1])
+
+        energy_error = np.abs(final_energy - initial_energy) / np.abs(initial_energy)
+        print(f"Относительная ошибка энергии: {energy_error:.2e}")
+
+        # Максимальная ошибка энергии по всей траектории
+        energy_history = calculate_energy(solution.y)
+        max_energy_error = np.max(np.abs(energy_history - initial_energy)) / np.abs(initial_energy)
+        print(f"Максимальная относительная ошибка энергии: {max_energy_error:.2e}")
+
+        # Анализ момента импульса
+        initial_moment = np.linalg.norm(calculate_angular_momentum(y0))
+        final_moment =  np.linalg.norm(calculate_angular_momentum(solution.y[:, -1]))
+
+        moment_error = np.abs(final_moment - initial_moment) / np.abs(initial_moment)
+        print(f"Относительная ошибка момента импульса: {moment_error:.2e}")
+
+        moment_history = np.linalg.norm(calculate_angular_momentum(solution.y), axis=0)
+        max_moment_error = np.max(np.abs(moment_history - initial_moment)) / np.abs(initial_moment)
+        print(f"Максимальная относительная ошибка момента импульса: {max_moment_error:.2e}")
 
-    energy_error = np.abs(final_energy - initial_energy) / np.abs(initial_energy)
-    print(f"Относительная ошибка энергии: {energy_error:.2e}")
+    if headless:
+        return solution
 
-    # Анализ момента импульса
-    initial_moment = np.linalg.norm(calculate_angular_momentum(y0))
-    final_moment =  np.linalg.norm(calculate_angular_momentum(solution.y[:, -1]))
+    with profiler.span('rendering'):
+        # Графические модули импортируются только при построении графиков
+        from animation_3D import animate_relative_orbit, save_animation, plot_orbits, plot_distances
+        from rendering import render_animation
 
-    moment_error = np.abs(final_moment - initial_moment) / np.abs(initial_moment)
-    print(f"Относительная ошибка момента импульса: {moment_error:.2e}")
+        # Вычисление относительных позиций
+        cruithne_relative_positions = cruithne_positions - earth_positions
 
-    # Вычисление относительных позиций
-    cruithne_relative_positions = cruithne_positions - earth_positions
+        plot_orbits(earth_positions, cruithne_positions)
 
-    plot_orbits(earth_positions, cruithne_positions)
+        # Создание анимации
 
-    # Создание анимации
+        anim = animate_relative_orbit(cruithne_relative_positions)
 
-    anim = animate_relative_orbit(cruithne_relative_positions)
+        # # Сохранение анимации
+        # save_animation(anim, 'relative_orbit_animation', file_format='gif', fps=60)
+        # # Или без дисплея, параллельно в пуле процессов:
+        # render_animation('relative', (cruithne_relative_positions,), 'relative_orbit_animation', file_format='gif', fps=60)
 
-    # # Сохранение анимации
-    # save_animation(anim, 'relative_orbit_animation', file_format='gif', fps=60)
+        plot_distances(earth_positions, cruithne_positions)
 
-    plot_distances(earth_positions, cruithne_positions)
+    return solution
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Орбиты Земли и Круитни")
+    parser.add_argument('--headless', action='store_true', help="только вычисления, без графиков")
+    parser.add_argument('--profile', metavar='REPORT.json', help="записать JSON-отчет профилировщика")
+    parser.add_argument('--dump', metavar='FILE', help="записать профиль cProfile/pyinstrument")
+    parser.add_argument('--dump-backend', choices=['cprofile', 'pyinstrument'], default='cprofile')
+    parser.add_argument('--trace-allocations', action='store_true', help="пик выделений памяти через tracemalloc")
+    parser.add_argument('--fixtures', metavar='DIR',
+                        help="брать элементы из записанных ответов в DIR вместо JPL Horizons (или VPV_FIXTURE_DIR)")
+    args = parser.parse_args()
+    if args.fixtures:
+        set_provider(FixtureProvider(args.fixtures))
+    main(headless=args.headless, profile=args.profile, dump=args.dump, dump_backend=args.dump_backend,
+         trace_allocations=args.trace_allocations)
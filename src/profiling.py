@@ -0,0 +1,162 @@
+import json
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+import scipy.integrate
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+def _peak_rss_mb():
+    """Пиковый объем резидентной памяти процесса в МБ (None, если недоступно)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # В Linux ru_maxrss в килобайтах, в macOS - в байтах
+    return peak / 1024**2 if sys.platform == 'darwin' else peak / 1024
+
+def instrumented_solver(method, stats):
+    """
+    Подкласс решателя solve_ivp с именем method, который записывает в stats
+    число принятых шагов и число вычислений правой части внутри шагов
+    (отброшенные попытки шага решатель делает внутри _step_impl, поэтому
+    напрямую они не видны).
+    Его можно передать в solve_ivp (и solve_orbits) вместо имени метода.
+    """
+    base = getattr(scipy.integrate, method)
+
+    class InstrumentedSolver(base):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            stats.update(solver=self, accepted_steps=0, step_nfev=0)
+
+        def _step_impl(self):
+            nfev_before = self.nfev
+            result = super()._step_impl()
+            stats['step_nfev'] += self.nfev - nfev_before
+            if result[0]:
+                stats['accepted_steps'] += 1
+            return result
+
+    InstrumentedSolver.__name__ = f'Instrumented{method}'
+    return InstrumentedSolver
+
+class Profiler:
+    """
+    Структурированный профиль запуска: длительности фаз (span), счетчики
+    вызовов функций (count_calls), статистика решателя (record_solver)
+    и пиковая память. Отчет выводится в JSON (write_json).
+    """
+
+    def __init__(self, track_allocations=False):
+        self.spans = {}
+        self.counters = {}
+        self.solver = {}
+        self._solver_stats = {}
+        self.track_allocations = track_allocations
+        if track_allocations:
+            tracemalloc.start()
+
+    @contextmanager
+    def span(self, name):
+        """Измеряет длительность фазы name (повторные фазы суммируются)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry = self.spans.setdefault(name, {'seconds': 0.0, 'count': 0})
+            entry['seconds'] += time.perf_counter() - start
+            entry['count'] += 1
+
+    def count_calls(self, name, function):
+        """Возвращает обертку над function, считающую ее вызовы в счетчике name."""
+        self.counters.setdefault(name, 0)
+
+        def counted(*args, **kwargs):
+            self.counters[name] += 1
+            return function(*args, **kwargs)
+
+        return counted
+
+    def solver_method(self, method):
+        """
+        Метод для solve_orbits: для методов solve_ivp - инструментированный
+        решатель, считающий принятые шаги, иначе method без изменений.
+        """
+        if isinstance(method, str) and hasattr(scipy.integrate, method):
+            return instrumented_solver(method, self._solver_stats)
+        return method
+
+    def record_solver(self, solution, method):
+        """
+        Сохраняет статистику решения solve_orbits, полученного с solver_method(method).
+        Число отброшенных шагов выводится из числа вычислений правой части и
+        известно только для явных методов Рунге-Кутты (RK23, RK45, DOP853);
+        для неявных методов и LSODA записывается None.
+        """
+        self.solver = {
+            'method': method,
+            'nfev': int(solution.nfev),
+            'njev': int(getattr(solution, 'njev', 0)),
+            'nlu': int(getattr(solution, 'nlu', 0)),
+        }
+        stats = self._solver_stats
+        if 'solver' in stats:
+            accepted = stats['accepted_steps']
+            self.solver['accepted_steps'] = accepted
+            # У явных методов Рунге-Кутты каждая попытка шага, принятая или нет,
+            # стоит ровно n_stages вычислений; у остальных методов число
+            # вычислений на попытку переменное (итерации Ньютона, смена метода в LSODA)
+            n_stages = getattr(stats['solver'], 'n_stages', None)
+            self.solver['rejected_steps'] = stats['step_nfev'] // n_stages - accepted if n_stages else None
+
+    def report(self):
+        report = {
+            'spans': self.spans,
+            'counters': self.counters,
+            'solver': self.solver,
+            'peak_rss_mb': _peak_rss_mb(),
+        }
+        if self.track_allocations:
+            report['peak_traced_mb'] = tracemalloc.get_traced_memory()[1] / 1024**2
+        return report
+
+    def write_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2, ensure_ascii=False)
+
+@contextmanager
+def profile_to_file(path, backend='cprofile'):
+    """
+    Профилирует блок кода и сохраняет результат в path: 'cprofile' - файл
+    pstats, 'pyinstrument' - HTML-отчет (если pyinstrument установлен,
+    иначе используется cProfile).
+    """
+    if backend == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler as PyinstrumentProfiler
+        except ImportError:
+            print("pyinstrument не установлен, используется cProfile")
+        else:
+            profiler = PyinstrumentProfiler()
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(profiler.output_html())
+            return
+
+    import cProfile
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
@@ -0,0 +1,168 @@
+import os
+import subprocess
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from animation_3D import orbits_scene, relative_orbit_scene, orbits_frames, relative_orbit_frames, date_labels
+from global_consts import RENDER_CHUNK
+
+# Сцены анимаций: функция построения сцены и номера кадров по числу точек траектории
+SCENES = {
+    'orbits': (orbits_scene, orbits_frames),
+    'relative': (relative_orbit_scene, relative_orbit_frames),
+}
+
+# Траектории для процесса пула: передаются один раз при его запуске,
+# а не с каждой частью кадров
+_positions = None
+
+def _init_worker(positions):
+    global _positions
+    _positions = positions
+
+def _render_chunk(scene, frames, labels, figsize, dpi):
+    """
+    Рисует кадры frames сцены scene без дисплея (холст Agg) и
+    возвращает размер кадра и список RGB-буферов.
+    """
+    fig = Figure(figsize=figsize, dpi=dpi)
+    canvas = FigureCanvasAgg(fig)
+    update = SCENES[scene][0](fig, *_positions)
+
+    buffers = []
+    for frame, label in zip(frames, labels):
+        update(frame, label)
+        canvas.draw()
+        buffers.append(np.asarray(canvas.buffer_rgba())[..., :3].tobytes())
+    return canvas.get_width_height(), buffers
+
+class _FfmpegWriter:
+    """Передает сырые RGB-кадры в один процесс ffmpeg через канал."""
+
+    def __init__(self, path, size, fps):
+        width, height = size
+        self.path = path
+        self.process = subprocess.Popen(
+            ['ffmpeg', '-y', '-loglevel', 'error',
+             '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f'{width}x{height}', '-r', str(fps), '-i', '-',
+             '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-vcodec', 'libx264', '-pix_fmt', 'yuv420p', path],
+            stdin=subprocess.PIPE,
+        )
+
+    def write(self, buffer):
+        self.process.stdin.write(buffer)
+
+    def close(self):
+        self.process.stdin.close()
+        if self.process.wait() != 0:
+            raise RuntimeError(f"ffmpeg завершился с кодом {self.process.returncode}")
+
+    def abort(self):
+        """Останавливает ffmpeg после ошибки и удаляет незаконченный файл."""
+        self.process.kill()
+        try:
+            self.process.stdin.close()
+        except BrokenPipeError:
+            pass
+        self.process.wait()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+class _GifWriter:
+    """
+    Пишет GIF по мере поступления кадров: каждый кадр переводится в палитру
+    Pillow и сразу записывается в файл со своей таблицей цветов.
+    Image.save(save_all=True) держал бы в памяти все кадры до конца записи.
+    """
+
+    def __init__(self, path, size, fps):
+        self.path = path
+        self.file = open(path, 'wb')
+        self.size = size
+        self.duration = 1000 / fps
+        self.header_written = False
+
+    def write(self, buffer):
+        from PIL import Image, GifImagePlugin
+
+        image = Image.frombytes('RGB', self.size, buffer).quantize()
+        if not self.header_written:
+            # Заголовок файла с бесконечным повтором анимации
+            header, _ = GifImagePlugin.getheader(image, info={'loop': 0, 'duration': self.duration})
+            self.file.write(b''.join(header))
+            self.header_written = True
+        self.file.write(b''.join(GifImagePlugin.getdata(image, duration=self.duration, include_color_table=True)))
+
+    def close(self):
+        self.file.write(b';')
+        self.file.close()
+
+    def abort(self):
+        """Закрывает файл после ошибки и удаляет его: без завершающего байта GIF неполон."""
+        self.file.close()
+        os.remove(self.path)
+
+_WRITERS = {'mp4': _FfmpegWriter, 'gif': _GifWriter}
+
+def render_animation(scene, positions, filename, file_format='mp4', fps=30, workers=None,
+                     chunk_size=RENDER_CHUNK, figsize=(6.4, 4.8), dpi=100):
+    """
+    Сохраняет анимацию без дисплея: даты всех кадров считаются одним
+    вызовом astropy, кадры рисуются частями в пуле процессов на холсте Agg
+    и по порядку передаются в ffmpeg (mp4) или Pillow (gif).
+
+    Параметры:
+    - scene: 'orbits' (positions = (earth_positions, cruithne_positions))
+             или 'relative' (positions = (cruithne_relative_positions,))
+    - filename: имя выходного файла без расширения
+    - file_format: формат файла ('mp4' или 'gif')
+    - fps: частота кадров в секунду
+    - workers: число процессов (по умолчанию - число ядер)
+    - chunk_size: число кадров в одной задаче
+    """
+    if file_format not in _WRITERS:
+        print(f"Неподдерживаемый формат: {file_format}. Используйте 'mp4' или 'gif'.")
+        return
+
+    positions = tuple(np.asarray(p) for p in positions)
+    n_samples = positions[0].shape[1]
+    frames = list(SCENES[scene][1](n_samples))
+    if not frames:
+        raise ValueError(f"Недостаточно точек траектории для анимации: {n_samples}")
+    labels = date_labels(frames, n_samples)
+
+    chunks = deque((frames[k:k + chunk_size], labels[k:k + chunk_size])
+                   for k in range(0, len(frames), chunk_size))
+    workers = workers or os.cpu_count()
+    path = f'{filename}.{file_format}'
+
+    writer = None
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(positions,)) as executor:
+            # Держим в работе не больше 2 * workers частей, чтобы не хранить все кадры в памяти
+            pending = deque()
+            try:
+                while chunks or pending:
+                    while chunks and len(pending) < 2 * workers:
+                        chunk_frames, chunk_labels = chunks.popleft()
+                        pending.append(executor.submit(_render_chunk, scene, chunk_frames, chunk_labels,
+                                                       figsize, dpi))
+                    size, buffers = pending.popleft().result()
+                    if writer is None:
+                        writer = _WRITERS[file_format](path, size, fps)
+                    for buffer in buffers:
+                        writer.write(buffer)
+            except BaseException:
+                # После ошибки оставшиеся части не нужны
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+    except BaseException:
+        # Не оставляем ffmpeg ждать кадров в канале и незаконченный файл
+        if writer is not None:
+            writer.abort()
+        raise
+
+    writer.close()
+    print(f"Анимация сохранена как {path}")
@@ -0,0 +1,142 @@
+import json
+import os
+import numpy as np
+from diff_equation_solver import solve_orbits
+from translation import vectors_to_kepler
+from global_consts import INTEGRATOR, CHUNK_SIZE
+
+class TrajectoryStore:
+    """
+    Ленивое чтение траектории, записанной propagate_chunked.
+    Массивы t (T,) и y (6N, T) отображаются в память и читаются
+    с диска только при обращении к нужному срезу.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.t = np.load(os.path.join(directory, 't.npy'), mmap_mode='r')
+        self.y = np.load(os.path.join(directory, 'y.npy'), mmap_mode='r')
+        self.completed = read_checkpoint(directory)['completed']
+
+    def __len__(self):
+        return self.completed
+
+    def positions(self, body, start=None, stop=None, step=None):
+        """Позиции тела body, массив (3, T) по уже посчитанной части траектории."""
+        return self.y[6 * body:6 * body + 3, self._slice(start, stop, step)]
+
+    def velocities(self, body, start=None, stop=None, step=None):
+        """Скорости тела body, массив (3, T) по уже посчитанной части траектории."""
+        return self.y[6 * body + 3:6 * body + 6, self._slice(start, stop, step)]
+
+    def times(self, start=None, stop=None, step=None):
+        return self.t[self._slice(start, stop, step)]
+
+    def iter_elements(self, body=None, chunk_size=CHUNK_SIZE):
+        """
+        Потоковый расчет оскулирующих элементов по частям траектории: в память
+        читается не более chunk_size моментов времени за раз.
+
+        Параметры:
+            body (int): номер тела; None - все тела сразу.
+            chunk_size (int): число моментов времени в одной части.
+
+        Возвращает:
+            генератор пар (t, elements): t - массив (T,), elements - словарь
+            как у vectors_to_kepler с массивами (T,) или (N, T) для body=None.
+        """
+        for start in range(0, self.completed, chunk_size):
+            index = self._slice(start, start + chunk_size, None)
+            if body is None:
+                chunk = self.y[:, index].reshape(-1, 6, index.stop - start)
+            else:
+                chunk = self.y[6 * body:6 * body + 6, index]
+            yield np.asarray(self.t[index]), vectors_to_kepler(chunk)
+
+    def _slice(self, start, stop, step):
+        # Не выходим за пределы уже посчитанной части траектории
+        stop = self.completed if stop is None else min(stop, self.completed)
+        return slice(start, stop, step)
+
+def read_checkpoint(directory):
+    with open(os.path.join(directory, 'checkpoint.json'), encoding='utf-8') as f:
+        return json.load(f)
+
+def _write_checkpoint(directory, completed, state, t_span, y0):
+    # t_span и y0 хранятся, чтобы продолжать только тот же самый расчет
+    path = os.path.join(directory, 'checkpoint.json')
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'completed': completed, 'state': list(map(float, state)),
+                   't_span': list(map(float, t_span)), 'y0': list(map(float, y0))}, f)
+    os.replace(tmp_path, path)
+
+def propagate_chunked(equations_of_motion, t_span, y0, t_eval, directory, chunk_size=CHUNK_SIZE,
+                      method=INTEGRATOR, resume=True, **kwargs):
+    """
+    Интегрирует систему по частям и дописывает каждую часть в файл y.npy,
+    отображенный в память. После каждой части сохраняется контрольная точка
+    (checkpoint.json), поэтому прерванный расчет можно продолжить.
+
+    Параметры:
+        equations_of_motion, t_span, y0, t_eval, method: как в solve_orbits:
+                          y0 - состояние в момент t_span[0], t_eval должны
+                          лежать внутри t_span (решение сохраняется только в них).
+        directory (str):  Каталог для t.npy, y.npy и checkpoint.json.
+        chunk_size (int): Число точек t_eval в одной части.
+        resume (bool):    Продолжить расчет с последней контрольной точки, если
+                          она записана для тех же t_span, y0 и t_eval.
+        kwargs:           Дополнительные аргументы solve_orbits.
+
+    Возвращает:
+        TrajectoryStore для ленивого чтения результата.
+    """
+    t_eval = np.asarray(t_eval, dtype=float)
+    y0 = np.asarray(y0, dtype=float)
+    t_span = tuple(map(float, t_span))
+    direction = np.sign(t_span[1] - t_span[0])
+    if np.any(direction * (t_eval - t_span[0]) < 0) or np.any(direction * (t_eval - t_span[1]) > 0):
+        raise ValueError(f"Моменты t_eval должны лежать внутри t_span={t_span}")
+    y_path = os.path.join(directory, 'y.npy')
+
+    if resume and os.path.exists(os.path.join(directory, 'checkpoint.json')):
+        checkpoint = read_checkpoint(directory)
+        y = np.load(y_path, mmap_mode='r+')
+        same_run = (y.shape == (y0.size, t_eval.size)
+                    and np.array_equal(np.load(os.path.join(directory, 't.npy')), t_eval)
+                    and checkpoint.get('t_span') == list(t_span)
+                    and np.array_equal(checkpoint.get('y0'), y0))
+        if not same_run:
+            raise ValueError(f"Контрольная точка в {directory} записана для другой задачи "
+                             f"(другие t_span, y0 или t_eval); для нового расчета передайте resume=False")
+        completed = checkpoint['completed']
+        state = np.array(checkpoint['state'])
+    else:
+        # Начальное состояние задано в t_span[0]: сначала переносим его в t_eval[0]
+        state = y0
+        if t_eval[0] != t_span[0]:
+            state = solve_orbits(equations_of_motion, (t_span[0], t_eval[0]), y0, t_eval[:1],
+                                 method=method, **kwargs).y[:, -1]
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, 't.npy'), t_eval)
+        y = np.lib.format.open_memmap(y_path, mode='w+', dtype=float, shape=(y0.size, t_eval.size))
+        y[:, 0] = state
+        y.flush()
+        completed = 1
+        _write_checkpoint(directory, completed, state, t_span, y0)
+
+    while completed < t_eval.size:
+        i0 = completed - 1
+        i1 = min(i0 + chunk_size, t_eval.size - 1)
+        segment = solve_orbits(equations_of_motion, (t_eval[i0], t_eval[i1]), state,
+                               t_eval[i0:i1 + 1], method=method, **kwargs)
+
+        y[:, i0 + 1:i1 + 1] = segment.y[:, 1:]
+        y.flush()
+
+        completed = i1 + 1
+        state = segment.y[:, -1]
+        _write_checkpoint(directory, completed, state, t_span, y0)
+
+    del y
+    return TrajectoryStore(directory)
@@ -0,0 +1,73 @@
+import numpy as np
+
+class Trajectory:
+    """
+    Непрерывная траектория, которую можно вычислить в произвольные моменты
+    времени без повторного интегрирования. Хранит интерполянт решателя
+    (OdeSolution из solve_ivp с dense_output=True), объем которого
+    растет с числом шагов, а не с числом точек вывода.
+    """
+
+    def __init__(self, interpolant, t_min, t_max, n_steps):
+        self._interpolant = interpolant
+        self.t_min = t_min
+        self.t_max = t_max
+        self.n_steps = n_steps
+
+    def __call__(self, t):
+        """Вектор состояния (6N,) или массив (6N, len(t)) в моменты t."""
+        return self._interpolant(t)
+
+    def sample(self, num, t_start=None, t_stop=None):
+        """
+        Возвращает num равномерных точек на отрезке [t_start, t_stop]
+        (по умолчанию - на всем интервале): (t, y) с y формы (6N, num).
+        """
+        t_start = self.t_min if t_start is None else t_start
+        t_stop = self.t_max if t_stop is None else t_stop
+        t = np.linspace(t_start, t_stop, num)
+        return t, self(t)
+
+    def positions(self, body, t):
+        """Позиции тела body в моменты t, массив (3, len(t))."""
+        return self(t)[6 * body:6 * body + 3]
+
+    def velocities(self, body, t):
+        """Скорости тела body в моменты t, массив (3, len(t))."""
+        return self(t)[6 * body + 3:6 * body + 6]
+
+class HermiteTrajectory(Trajectory):
+    """
+    Компактная траектория из узлов шагов интегратора: значения y_k и
+    производные dydt_k в узлах t_k, между узлами - кубический многочлен Эрмита.
+    Используется для интеграторов с постоянным шагом, у которых нет
+    собственного непрерывного решения.
+    """
+
+    def __init__(self, t, y, dydt):
+        self.t_nodes = np.asarray(t, dtype=float)
+        self.y_nodes = np.asarray(y, dtype=float)
+        self.dydt_nodes = np.asarray(dydt, dtype=float)
+        super().__init__(self._hermite, self.t_nodes[0], self.t_nodes[-1], self.t_nodes.size - 1)
+
+    def _hermite(self, t):
+        t = np.asarray(t, dtype=float)
+        scalar = t.ndim == 0
+        t = np.atleast_1d(t)
+
+        # Индекс отрезка [t_k, t_k+1], содержащего каждую точку
+        k = np.clip(np.searchsorted(self.t_nodes, t, side='right') - 1, 0, self.t_nodes.size - 2)
+        t0 = self.t_nodes[k]
+        h = self.t_nodes[k + 1] - t0
+        s = (t - t0) / h
+        s2 = s * s
+        s3 = s2 * s
+
+        h00 = 2 * s3 - 3 * s2 + 1
+        h10 = (s3 - 2 * s2 + s) * h
+        h01 = -2 * s3 + 3 * s2
+        h11 = (s3 - s2) * h
+
+        y = (h00 * self.y_nodes[:, k] + h10 * self.dydt_nodes[:, k]
+             + h01 * self.y_nodes[:, k + 1] + h11 * self.dydt_nodes[:, k + 1])
+        return y[:, 0] if scalar else y
@@ -1,120 +1,207 @@
 import numpy as np
-from global_consts import GM_sun
+from global_consts import GM_sun, AU_IN_METERS
 
-def kepler_to_vectors(a, e, i_deg, Omega_deg, omega_deg, M_deg):
+def solve_kepler(M, e, tol=1e-14, max_iter=100):
     """
-    Переводит орбитальные элементы Кеплера (a, e, i, Omega, omega, M)
-    в прямоугольные координаты r(t) и v(t) в гелиоцентрической 
-    (эклиптической) системе координат.
-    
+    Численно решаем уравнение Кеплера M = E - e sin(E)
+    методом Ньютона одновременно для массива орбит. Итерации
+    продолжаются только для еще не сошедшихся элементов.
+    """
+    M = np.asarray(M, dtype=float)
+    e = np.broadcast_to(np.asarray(e, dtype=float), M.shape)
+    E = M.copy()  # начальное приближение
+    active = np.ones(M.shape, dtype=bool)
+    for _ in range(max_iter):
+        E_a = E[active]
+        e_a = e[active]
+        f = E_a - e_a * np.sin(E_a) - M[active]
+        fprime = 1 - e_a * np.cos(E_a)
+        E_new = E_a - f / fprime
+        E[active] = E_new
+        active[active] = np.abs(E_new - E_a) >= tol
+        if not active.any():
+            break
+    return E
+
+def _rotation_z(angle):
+    """Стопка матриц поворота вокруг оси Z, массив (N, 3, 3)."""
+    c, s = np.cos(angle), np.sin(angle)
+    R = np.zeros(angle.shape + (3, 3))
+    R[:, 0, 0], R[:, 0, 1] = c, -s
+    R[:, 1, 0], R[:, 1, 1] = s, c
+    R[:, 2, 2] = 1
+    return R
+
+def _rotation_x(angle):
+    """Стопка матриц поворота вокруг оси X, массив (N, 3, 3)."""
+    c, s = np.cos(angle), np.sin(angle)
+    R = np.zeros(angle.shape + (3, 3))
+    R[:, 0, 0] = 1
+    R[:, 1, 1], R[:, 1, 2] = c, -s
+    R[:, 2, 1], R[:, 2, 2] = s, c
+    return R
+
+def kepler_to_vectors_batch(a, e, i_deg, Omega_deg, omega_deg, M_deg):
+    """
+    Переводит массивы орбитальных элементов Кеплера (a, e, i, Omega, omega, M)
+    в прямоугольные координаты для N объектов сразу.
+
     Параметры:
-        a (float):       Большая полуось орбиты (в а.е.).
-        e (float):       Эксцентриситет.
-        i_deg (float):   Наклонение орбиты в градусах.
-        Omega_deg (float): Долгота восходящего узла в градусах.
-        omega_deg (float): Аргумент перицентра (перигелия) в градусах.
-        M_deg (float):   Средняя аномалия в градусах (на заданную эпоху).
-        
+        a, e, i_deg, Omega_deg, omega_deg, M_deg (array_like):
+            Массивы одинаковой длины N в тех же единицах, что и
+            у kepler_to_vectors.
+
     Возвращает:
-        (r_sun, v_sun) кортеж из двух numpy-векторов (по 3 элемента):
-         - r_sun (м)   : радиус-вектор от Солнца
-         - v_sun (м/с) : вектор скорости относительно Солнца
+        (r_sun, v_sun) кортеж из двух массивов (N, 3):
+         - r_sun (м)   : радиус-векторы от Солнца
+         - v_sun (м/с) : векторы скорости относительно Солнца
     """
+    a, e, i_deg, Omega_deg, omega_deg, M_deg = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(x, dtype=float)) for x in (a, e, i_deg, Omega_deg, omega_deg, M_deg))
+    )
 
     i = np.radians(i_deg)
     Omega = np.radians(Omega_deg)
     omega = np.radians(omega_deg)
     M = np.radians(M_deg)
 
-    a_m = a * 1.496e11
+    a_m = a * AU_IN_METERS
 
     # --- 1) Решаем уравнение Кеплера для эксцентрической аномалии E ---
-    def solve_kepler(M, e, tol=1e-14, max_iter=100):
-        """
-        Численно решаем уравнение Кеплера M = E - e sin(E)
-        методом Ньютона.
-        """
-        E = M  # начальное приближение
-        for _ in range(max_iter):
-            f = E - e * np.sin(E) - M
-            fprime = 1 - e * np.cos(E)
-            E_new = E - f / fprime
-            if abs(E_new - E) < tol:
-                E = E_new
-                break
-            E = E_new
-        return E
-
     E = solve_kepler(M, e)
 
-    # --- 2) Истинная аномалия theta ---
-    # theta = 2 * arctan( sqrt((1+e)/(1-e)) * tan(E/2) ) 
-    # но лучше использовать arctan2 для устойчивости
-    sin_E = np.sin(E)
-    cos_E = np.cos(E)
-    # Можно напрямую через формулу с arctan2:
+    # --- 2) Истинная аномалия theta (через arctan2 для устойчивости) ---
     theta = 2 * np.arctan2(np.sqrt(1 + e) * np.sin(E / 2),
                            np.sqrt(1 - e) * np.cos(E / 2))
 
-    # --- 3) Радиус вектора r ---
-    # r = a (1 - e cos(E)) в метрах
-    r = a_m * (1 - e * cos_E)
+    # --- 3) Радиус вектора r = a (1 - e cos(E)) в метрах ---
+    r = a_m * (1 - e * np.cos(E))
 
     # --- 4) Параметр орбиты (p = a(1 - e^2)) ---
     p = a_m * (1 - e**2)
 
-    # --- 5) Скорости в полярных координатах орбитальной плоскости ---
-    # Радиационная компонента скорости:
-    #  vr = sqrt(mu/p)* e*sin(theta)
-    # Тангенциальная компонента:
-    #  vt = sqrt(mu/p)* (1 + e*cos(theta))
+    # --- 5) Радиальная и тангенциальная скорости в плоскости орбиты ---
     mu = GM_sun  # гравитационный параметр Солнца
     vr = np.sqrt(mu / p) * e * np.sin(theta)
     vt = np.sqrt(mu / p) * (1 + e * np.cos(theta))
 
-    # --- 6) Переходим в декартовы координаты в орбитальной плоскости ---
-    # Положение (x_orb, y_orb):
-    x_orb = r * np.cos(theta)
-    y_orb = r * np.sin(theta)
-    z_orb = 0.0
-
-    # Скорость (vx_orb, vy_orb):
-    # Формулы (см. стандартный вывод в учебниках по небесной механике):
-    # vx_orb = vr*cos(theta) - vt*sin(theta)
-    # vy_orb = vr*sin(theta) + vt*cos(theta)
-    vx_orb = vr * np.cos(theta) - vt * np.sin(theta)
-    vy_orb = vr * np.sin(theta) + vt * np.cos(theta)
-    vz_orb = 0.0
-
-    # Собираем вектора в орбитальной плоскости
-    r_orb = np.array([x_orb, y_orb, z_orb])
-    v_orb = np.array([vx_orb, vy_orb, vz_orb])
-
-    # --- 7) Переходим из орбитальной плоскости в гелиоцентрическую ---
-    # Матрицы поворота: Rz(Omega) * Rx(i) * Rz(omega)
-    R_z_Omega = np.array([
-        [np.cos(Omega), -np.sin(Omega), 0],
-        [np.sin(Omega),  np.cos(Omega), 0],
-        [0,              0,             1]
-    ])
-
-    R_x_i = np.array([
-        [1,          0,           0],
-        [0,  np.cos(i), -np.sin(i)],
-        [0,  np.sin(i),  np.cos(i)]
-    ])
-
-    R_z_omega = np.array([
-        [np.cos(omega), -np.sin(omega), 0],
-        [np.sin(omega),  np.cos(omega), 0],
-        [0,              0,             1]
-    ])
-
-    # Общая матрица поворота
-    rotation_matrix = R_z_Omega @ R_x_i @ R_z_omega
-
-    # Применяем поворот к r_orb и v_orb:
-    r_sun = rotation_matrix @ r_orb   # координаты в эклиптической системе
-    v_sun = rotation_matrix @ v_orb   # скорости в эклиптической системе
-
-    return r_sun, v_sun
\ No newline at end of file
+    # --- 6) Декартовы координаты в орбитальной плоскости, массивы (N, 3) ---
+    cos_theta = np.cos(theta)
+    sin_theta = np.sin(theta)
+    zeros = np.zeros_like(theta)
+    r_orb = np.stack([r * cos_theta, r * sin_theta, zeros], axis=-1)
+    v_orb = np.stack([vr * cos_theta - vt * sin_theta,
+                      vr * sin_theta + vt * cos_theta, zeros], axis=-1)
+
+    # --- 7) Поворот Rz(Omega) * Rx(i) * Rz(omega) для всех орбит сразу ---
+    rotation_matrix = np.einsum('nij,njk,nkl->nil',
+                                _rotation_z(Omega), _rotation_x(i), _rotation_z(omega))
+
+    r_sun = np.einsum('nij,nj->ni', rotation_matrix, r_orb)
+    v_sun = np.einsum('nij,nj->ni', rotation_matrix, v_orb)
+
+    return r_sun, v_sun
+
+def vectors_to_kepler(y, mu=GM_sun, tol=1e-10):
+    """
+    Переводит векторы состояния в оскулирующие элементы Кеплера за один
+    векторизованный проход - обратное преобразование к kepler_to_vectors_batch.
+
+    Параметры:
+        y (array_like): массив (..., 6, T) или (6,) с компонентами
+                        (x, y, z, vx, vy, vz) в м и м/с относительно Солнца,
+                        например траектория тела (6, T) или клонов (N, 6, T).
+        mu (float):     гравитационный параметр центрального тела.
+        tol (float):    порог почти круговых (e < tol) и почти экваториальных
+                        (sin i < tol) орбит.
+
+    Возвращает:
+        словарь массивов формы y без оси компонент с ключами как у
+        get_orbital_elements: 'a' (а.е.), 'e', 'incl', 'Omega', 'w', 'M' (градусы).
+        Для экваториальных орбит Omega = 0 и w отсчитывается от оси X
+        (долгота перигелия); для круговых w = 0 и M отсчитывается от узла
+        (аргумент широты). Для незамкнутых орбит (e >= 1) a < 0 и M = nan.
+    """
+    y = np.asarray(y, dtype=float)
+    axis = 0 if y.ndim == 1 else -2
+    if y.shape[axis] != 6:
+        raise ValueError(f"Ожидается массив (..., 6, T) или (6,), получен {y.shape}")
+    # Компоненты в последней оси: массивы (..., 3)
+    state = np.moveaxis(y, axis, -1)
+    r, v = state[..., :3], state[..., 3:]
+
+    r_norm = np.linalg.norm(r, axis=-1)
+    v2 = np.einsum('...k,...k->...', v, v)
+    rv = np.einsum('...k,...k->...', r, v)
+    h = np.cross(r, v)
+    h_norm = np.linalg.norm(h, axis=-1)
+
+    a = 1 / (2 / r_norm - v2 / mu)
+    e_vec = np.cross(v, h) / mu - r / r_norm[..., None]
+    e = np.linalg.norm(e_vec, axis=-1)
+    incl = np.arccos(np.clip(h[..., 2] / h_norm, -1, 1))
+
+    # Линия узлов n = z x h; для экваториальных орбит узел заменяется осью X
+    n = np.stack([-h[..., 1], h[..., 0], np.zeros_like(h_norm)], axis=-1)
+    n_norm = np.linalg.norm(n, axis=-1)
+    equatorial = n_norm < tol * h_norm
+    n_hat = np.where(equatorial[..., None], [1.0, 0.0, 0.0], n / np.where(equatorial, 1, n_norm)[..., None])
+    Omega = np.where(equatorial, 0.0, np.arctan2(n[..., 1], n[..., 0]))
+
+    # Аргумент широты: угол от узла до r в плоскости орбиты
+    h_hat = h / h_norm[..., None]
+    u = np.arctan2(np.einsum('...k,...k->...', np.cross(n_hat, r), h_hat),
+                   np.einsum('...k,...k->...', n_hat, r))
+
+    # Истинная аномалия: e cos(nu) = p / r - 1, e sin(nu) = sqrt(p / mu) (r . v) / r
+    p = h_norm**2 / mu
+    nu = np.arctan2(np.sqrt(p / mu) * rv / r_norm, p / r_norm - 1)
+    circular = e < tol
+    nu = np.where(circular, u, nu)
+    w = np.where(circular, 0.0, u - nu)
+
+    # Средняя аномалия через эксцентрическую (только для эллиптических орбит)
+    with np.errstate(invalid='ignore'):
+        E = 2 * np.arctan2(np.sqrt(1 - e) * np.sin(nu / 2), np.sqrt(1 + e) * np.cos(nu / 2))
+        M = np.where(e < 1, E - e * np.sin(E), np.nan)
+
+    return {
+        'a': a / AU_IN_METERS,
+        'e': e,
+        'incl': np.degrees(incl),
+        'Omega': np.degrees(Omega) % 360,
+        'w': np.degrees(w) % 360,
+        'M': np.degrees(M) % 360,
+    }
+
+def elements_to_vectors(elements):
+    """
+    Переводит таблицу орбитальных элементов (DataFrame из get_orbital_elements)
+    в массивы r_sun, v_sun размера (N, 3) - по строке на объект или эпоху.
+    """
+    return kepler_to_vectors_batch(
+        elements['a'].to_numpy(), elements['e'].to_numpy(), elements['incl'].to_numpy(),
+        elements['Omega'].to_numpy(), elements['w'].to_numpy(), elements['M'].to_numpy()
+    )
+
+def kepler_to_vectors(a, e, i_deg, Omega_deg, omega_deg, M_deg):
+    """
+    Переводит орбитальные элементы Кеплера (a, e, i, Omega, omega, M)
+    в прямоугольные координаты r(t) и v(t) в гелиоцентрической 
+    (эклиптической) системе координат.
+    
+    Параметры:
+        a (float):       Большая полуось орбиты (в а.е.).
+        e (float):       Эксцентриситет.
+        i_deg (float):   Наклонение орбиты в градусах.
+        Omega_deg (float): Долгота восходящего узла в градусах.
+        omega_deg (float): Аргумент перицентра (перигелия) в градусах.
+        M_deg (float):   Средняя аномалия в градусах (на заданную эпоху).
+        
+    Возвращает:
+        (r_sun, v_sun) кортеж из двух numpy-векторов (по 3 элемента):
+         - r_sun (м)   : радиус-вектор от Солнца
+         - v_sun (м/с) : вектор скорости относительно Солнца
+    """
+    r_sun, v_sun = kepler_to_vectors_batch(a, e, i_deg, Omega_deg, omega_deg, M_deg)
+    return r_sun[0], v_sun[0]
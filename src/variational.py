@@ -0,0 +1,162 @@
+import numpy as np
+from scipy.integrate import solve_ivp
+from scipy.optimize import OptimizeResult
+from diff_equation_solver import nbody_accelerations, gravity_sources
+from global_consts import GM_sun, BODY_MASSES, BODY_MASSLESS, rtol_val, atol_val
+
+YEAR = 365.25 * 24 * 3600
+
+def variational_accelerations(r, dr, gm, sources, gm_central=GM_sun):
+    """
+    Произведение аналитического якобиана гравитационных ускорений на векторы
+    отклонений: da = (da/dr) dr. Для каждой пары тел якобиан равен
+    -GM / d^3 (I - 3 d^ d^T), поэтому матрица 3N x 3N явно не строится.
+
+    Параметры:
+        r (ndarray):  позиции тел (N, 3).
+        dr (ndarray): отклонения позиций (..., N, 3) - ведущие оси нумеруют
+                      независимые касательные векторы.
+        gm, sources, gm_central: как в nbody_accelerations.
+
+    Возвращает:
+        ndarray (..., N, 3) отклонений ускорений.
+    """
+    r_norm = np.sqrt(np.einsum('ij,ij->i', r, r))
+    r_hat = r / r_norm[:, None]
+    proj = np.einsum('ij,...ij->...i', r_hat, dr)
+    da = -gm_central / r_norm[:, None]**3 * (dr - 3 * r_hat * proj[..., None])
+
+    if sources.size:
+        diff = r[:, None, :] - r[None, sources, :]
+        dist2 = np.einsum('ijk,ijk->ij', diff, diff)
+        # Тело не притягивает само себя: коэффициент и направление обнуляются
+        dist2[sources, np.arange(sources.size)] = np.inf
+        d_hat = diff / np.sqrt(dist2)[..., None]
+        ddiff = dr[..., :, None, :] - dr[..., None, sources, :]
+        proj = np.einsum('ijk,...ijk->...ij', d_hat, ddiff)
+        da -= np.einsum('ij,...ijk->...ik', gm[sources] * dist2**-1.5, ddiff - 3 * d_hat * proj[..., None])
+
+    return da
+
+def make_variational_equations(masses, massless=None, n_tangent=1, t0=0.0):
+    """
+    Правая часть уравнений движения N тел вместе с уравнениями в вариациях
+    для n_tangent касательных векторов и накопителями MEGNO.
+
+    Расширенный вектор состояния:
+        y (6N) | касательные векторы (n_tangent x 6N) |
+        ln(|d| / |d0|), интеграл w = int (d'.d / d.d) s ds, интеграл z = int Y ds
+        (по n_tangent значений каждого), где s = t - t0.
+
+    Возвращает:
+        функцию f(t, y) для solve_ivp.
+    """
+    gm, sources = gravity_sources(masses, massless)
+    size = 6 * gm.size
+    tangent_end = size + n_tangent * size
+
+    def rhs(t, y):
+        dydt = np.empty_like(y)
+        state = y[:size].reshape(-1, 6)
+        d_state = dydt[:size].reshape(-1, 6)
+        d_state[:, :3] = state[:, 3:]
+        d_state[:, 3:] = nbody_accelerations(state[:, :3], gm, sources)
+
+        tangent = y[size:tangent_end].reshape(n_tangent, -1, 6)
+        d_tangent = dydt[size:tangent_end].reshape(n_tangent, -1, 6)
+        d_tangent[..., :3] = tangent[..., 3:]
+        d_tangent[..., 3:] = variational_accelerations(state[:, :3], tangent[..., :3], gm, sources)
+
+        flat = tangent.reshape(n_tangent, -1)
+        rate = np.einsum('ij,ij->i', d_tangent.reshape(n_tangent, -1), flat) / np.einsum('ij,ij->i', flat, flat)
+        s = t - t0
+        w = y[tangent_end + n_tangent:tangent_end + 2 * n_tangent]
+        dydt[tangent_end:tangent_end + n_tangent] = rate
+        dydt[tangent_end + n_tangent:tangent_end + 2 * n_tangent] = rate * s
+        # Y(s) = 2 w / s, в начале интегрирования w ~ s^2, поэтому Y(0) = 0
+        dydt[tangent_end + 2 * n_tangent:] = 2 * w / s if s > 0 else 0.0
+        return dydt
+
+    return rhs
+
+def initial_tangent_vectors(n_bodies, bodies, seed=None):
+    """
+    Единичные касательные векторы со случайным направлением отклонения
+    позиции (скорость не возмущается) - по одному на каждое тело из bodies.
+
+    Возвращает:
+        ndarray (len(bodies), 6N).
+    """
+    rng = np.random.default_rng(seed)
+    direction = rng.normal(size=(len(bodies), 3))
+    tangents = np.zeros((len(bodies), n_bodies, 6))
+    tangents[np.arange(len(bodies)), bodies, :3] = direction / np.linalg.norm(direction, axis=1)[:, None]
+    return tangents.reshape(len(bodies), -1)
+
+def solve_variational(t_span, y0, t_eval, masses=BODY_MASSES, massless=BODY_MASSLESS, tangents=None,
+                      method='DOP853', rtol=rtol_val, atol=atol_val, seed=None):
+    """
+    Интегрирует траекторию вместе с уравнениями в вариациях и за один проход
+    вычисляет индикаторы хаоса: MEGNO <Y> и оценку максимального показателя
+    Ляпунова. Для квазипериодических орбит <Y> стремится к 2, для хаотических
+    растет как lambda * t / 2.
+
+    Отклонение пробной частицы не влияет на остальные тела, поэтому при
+    касательных векторах по умолчанию (по одному на каждую пробную частицу)
+    одна интеграция дает индикаторы сразу для всех частиц - например, для
+    клонов, добавленных через ensemble.pack_clones.
+
+    Параметры:
+        t_span, y0, t_eval: как в solve_ivp.
+        masses, massless:   массы тел и маска пробных частиц.
+        tangents (ndarray): начальные касательные векторы (K, 6N); по умолчанию
+                            случайные единичные отклонения позиции каждой
+                            пробной частицы (или всех тел, если их нет).
+        method, rtol, atol: параметры solve_ivp.
+        seed:               зерно для касательных векторов по умолчанию.
+
+    Возвращает:
+        OptimizeResult с полями t, y (6N, T), tangents (K, 6N, T),
+        megno (K, T) - значения Y, mean_megno (K, T) - <Y>,
+        lyapunov (K, T) - ln(|d| / |d0|) / t в 1/год, nfev.
+    """
+    y0 = np.asarray(y0, dtype=float)
+    n_bodies = y0.size // 6
+    if tangents is None:
+        massless_bodies = np.flatnonzero(massless) if massless is not None else np.array([], dtype=int)
+        bodies = massless_bodies if massless_bodies.size else np.arange(n_bodies)
+        tangents = initial_tangent_vectors(n_bodies, bodies, seed)
+    tangents = np.atleast_2d(np.asarray(tangents, dtype=float))
+    if tangents.shape[1] != y0.size:
+        raise ValueError(f"Касательные векторы должны иметь длину {y0.size}, получено {tangents.shape[1]}")
+    n_tangent = tangents.shape[0]
+
+    rhs = make_variational_equations(masses, massless, n_tangent, t_span[0])
+    # Касательные векторы нормируются: рост отсчитывается от |d0| = 1
+    tangents = tangents / np.linalg.norm(tangents, axis=1)[:, None]
+    y_aug = np.concatenate([y0, tangents.ravel(), np.zeros(3 * n_tangent)])
+    solution = solve_ivp(rhs, t_span, y_aug, method=method, t_eval=t_eval, rtol=rtol, atol=atol)
+
+    size = y0.size
+    tangent_end = size + n_tangent * size
+    s = solution.t - t_span[0]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        log_growth = solution.y[tangent_end:tangent_end + n_tangent]
+        w = solution.y[tangent_end + n_tangent:tangent_end + 2 * n_tangent]
+        z = solution.y[tangent_end + 2 * n_tangent:]
+        megno = np.where(s > 0, 2 * w / s, 0.0)
+        mean_megno = np.where(s > 0, z / s, 0.0)
+        lyapunov = np.where(s > 0, log_growth / (s / YEAR), 0.0)
+
+    return OptimizeResult(
+        t=solution.t,
+        y=solution.y[:size],
+        tangents=solution.y[size:tangent_end].reshape(n_tangent, size, -1),
+        megno=megno,
+        mean_megno=mean_megno,
+        lyapunov=lyapunov,
+        nfev=solution.nfev,
+        status=solution.status,
+        message=solution.message,
+        success=solution.success,
+    )
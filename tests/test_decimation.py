@@ -0,0 +1,23 @@
+import numpy as np
+
+from decimation import polyline_indices
+
+
+def test_polyline_keeps_many_orbits_ring_shaped():
+    # 50 витков окружности радиуса 1 по 400 точек: прореживание не должно
+    # соединять противоположные стороны орбиты
+    theta = np.linspace(0, 50 * 2 * np.pi, 20000)
+    points = np.vstack([np.cos(theta), np.sin(theta), 0.01 * np.sin(theta / 7)])
+    tolerance = 2 / 640
+
+    idx = polyline_indices(points, tolerance)
+    kept = points[:, idx]
+    midpoints = (kept[:, 1:] + kept[:, :-1]) / 2
+
+    assert idx[0] == 0 and idx[-1] == theta.size - 1
+    assert idx.size < theta.size // 2
+    assert np.linalg.norm(midpoints[:2], axis=0).min() > 1 - tolerance
+
+
+def test_polyline_short_input():
+    np.testing.assert_array_equal(polyline_indices(np.zeros((3, 2)), 1.0), [0, 1])
@@ -0,0 +1,36 @@
+import numpy as np
+
+from benchmark import frozen_system
+from diff_equation_solver import solve_orbits, make_equations_of_motion
+from events import relative_longitude_event, close_approach_event, substep_grid
+
+YEAR = 365.25 * 24 * 3600
+
+
+def _solve(method, events, years=30):
+    y0, masses, massless = frozen_system(2)
+    return solve_orbits(make_equations_of_motion(masses, massless), (0, years * YEAR), y0, None, method=method,
+                        masses=masses, massless=massless, events=events, rtol=1e-10)
+
+
+def test_substep_grid():
+    np.testing.assert_allclose(substep_grid([0.0, 4.0, 6.0], 2), [0, 2, 4, 5, 6])
+
+
+def test_solve_ivp_events_match_fixed_step_nodes():
+    # Длинные шаги DOP853 содержат пары пересечений долготы, которые
+    # не видны по знакам на концах шагов
+    adaptive = _solve('DOP853', [relative_longitude_event()])
+    fixed = _solve('wisdom_holman', [relative_longitude_event()])
+    assert fixed.t_events[0].size > 0
+    assert adaptive.t_events[0].size == fixed.t_events[0].size
+    np.testing.assert_allclose(adaptive.t_events[0], fixed.t_events[0], atol=3600)
+
+
+def test_terminal_event_truncates_solution():
+    solution = _solve('DOP853', [close_approach_event(terminal=True), relative_longitude_event()])
+    t_stop = solution.t_events[0][0]
+    assert solution.status == 1
+    assert solution.t[-1] <= t_stop
+    assert solution.t_events[0].size == 1
+    assert np.all(solution.t_events[1] <= t_stop)
@@ -0,0 +1,125 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from get_coordinates import FixtureProvider, ElementsCache, fetch_states, fetch_frames, _query
+from global_consts import AU_IN_METERS
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+EPOCHS = [2451544.5, 2451545.5, 2451546.5]
+IDS = ['399', '3753']
+
+@pytest.fixture
+def provider():
+    return FixtureProvider(FIXTURES)
+
+class FlakyProvider:
+    """Сетевой источник-заглушка: первые failures запросов завершаются ошибкой error."""
+    uses_network = True
+
+    def __init__(self, failures, error=ConnectionError, directory=FIXTURES):
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+        self.fixtures = FixtureProvider(directory)
+
+    def vectors(self, object_id, epochs, location):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error("сбой")
+        return self.fixtures.vectors(object_id, epochs, location)
+
+def test_fetch_states_stacks_ids_and_epochs(provider):
+    # Группы по две эпохи: на каждый объект два запроса, склеенные по времени
+    states = fetch_states(IDS, EPOCHS, provider=provider, epoch_batch=2)
+    assert states.shape == (len(IDS), 6, len(EPOCHS))
+
+    for n, object_id in enumerate(IDS):
+        for k, epoch in enumerate(EPOCHS):
+            single = fetch_states([object_id], [epoch], provider=provider)
+            np.testing.assert_array_equal(states[n, :, k], single[0, :, 0])
+
+def test_vectors_converted_to_si(provider):
+    states = fetch_states(IDS, EPOCHS, provider=provider)
+    df = pd.read_json(os.path.join(FIXTURES, 'vectors_3753.json'), orient='split')
+
+    np.testing.assert_allclose(states[1, :3], df[['x', 'y', 'z']].to_numpy().T * AU_IN_METERS, rtol=1e-15)
+    np.testing.assert_allclose(states[1, 3:], df[['vx', 'vy', 'vz']].to_numpy().T * AU_IN_METERS / 86400,
+                               rtol=1e-15)
+
+def test_elements_and_vectors_agree(provider):
+    from_vectors = fetch_states(IDS, EPOCHS, provider=provider, kind='vectors')
+    from_elements = fetch_states(IDS, EPOCHS, provider=provider, kind='elements')
+    np.testing.assert_allclose(from_elements, from_vectors, rtol=1e-9, atol=1e-3)
+
+def test_fetch_frames_keeps_epoch_order(provider):
+    frames = fetch_frames(IDS, EPOCHS, provider=provider, epoch_batch=1)
+    for df in frames:
+        assert df['datetime_jd'].tolist() == EPOCHS
+
+def test_transient_errors_are_retried():
+    flaky = FlakyProvider(failures=2)
+    df = _query('vectors', '399', EPOCHS, '@sun', flaky, cache=False, offline=False, retries=3, backoff=0)
+    assert flaky.calls == 3
+    assert len(df) == len(EPOCHS)
+
+def test_retries_exhausted():
+    flaky = FlakyProvider(failures=10, error=TimeoutError)
+    with pytest.raises(ValueError):
+        _query('vectors', '399', EPOCHS, '@sun', flaky, cache=False, offline=False, retries=2, backoff=0)
+    assert flaky.calls == 3
+
+def test_deterministic_errors_not_retried():
+    flaky = FlakyProvider(failures=10, error=KeyError)
+    with pytest.raises(ValueError):
+        _query('vectors', '399', EPOCHS, '@sun', flaky, cache=False, offline=False, retries=3, backoff=0)
+    assert flaky.calls == 1
+
+def test_fetch_states_retries_each_request():
+    flaky = FlakyProvider(failures=1)
+    states = fetch_states(['399'], EPOCHS, provider=flaky, cache=False, backoff=0)
+    assert states.shape == (1, 6, len(EPOCHS))
+    assert flaky.calls == 2
+
+def test_offline_refuses_network(tmp_path):
+    flaky = FlakyProvider(failures=0)
+    with pytest.raises(ValueError):
+        fetch_states(['399'], EPOCHS, provider=flaky, cache=ElementsCache(str(tmp_path)), offline=True)
+    assert flaky.calls == 0
+
+def test_offline_served_from_cache(tmp_path):
+    cache = ElementsCache(str(tmp_path))
+    online = fetch_states(['399'], EPOCHS, provider=FlakyProvider(failures=0), cache=cache)
+
+    flaky = FlakyProvider(failures=0)
+    offline = fetch_states(['399'], EPOCHS, provider=flaky, cache=cache, offline=True)
+    assert flaky.calls == 0
+    np.testing.assert_allclose(offline, online, rtol=1e-14)
+
+def test_fixture_responses_not_cached(tmp_path, provider):
+    fetch_states(IDS, EPOCHS, provider=provider, cache=ElementsCache(str(tmp_path)))
+    assert os.listdir(tmp_path) == []
+
+def test_offline_keeps_stale_entries(tmp_path):
+    # ttl=0: запись устаревает сразу после записи
+    cache = ElementsCache(str(tmp_path), ttl=0)
+    online = fetch_states(['399'], EPOCHS, provider=FlakyProvider(failures=0), cache=cache)
+
+    # Офлайн устаревшая запись возвращается и не удаляется
+    offline = fetch_states(['399'], EPOCHS, provider=FlakyProvider(failures=0), cache=cache, offline=True)
+    np.testing.assert_allclose(offline, online, rtol=1e-14)
+    assert len(os.listdir(tmp_path)) == 1
+
+    # С доступом к сети устаревшая запись запрашивается заново
+    flaky = FlakyProvider(failures=0)
+    fetch_states(['399'], EPOCHS, provider=flaky, cache=cache)
+    assert flaky.calls == 1
+
+def test_fixture_selects_requested_epochs(provider):
+    df = provider.elements('399', ['2000-01-03', 2451544.5], '@sun')
+    assert list(df['datetime_jd']) == [2451546.5, 2451544.5]
+
+@pytest.mark.parametrize('epochs', [[2460000.5], ['2024-01-01'], [2451544.5, 2451547.5]])
+def test_fixture_missing_epochs_rejected(provider, epochs):
+    with pytest.raises(ValueError):
+        provider.elements('399', epochs, '@sun')
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from benchmark import frozen_system
+from diff_equation_solver import solve_orbits, make_equations_of_motion
+from storage import propagate_chunked
+
+YEAR = 365.25 * 24 * 3600
+
+
+@pytest.fixture
+def system():
+    y0, masses, massless = frozen_system(2)
+    return make_equations_of_motion(masses, massless), y0
+
+
+def test_t_eval_starting_after_t_span(tmp_path, system):
+    rhs, y0 = system
+    t_eval = np.linspace(0.5 * YEAR, YEAR, 30)
+    store = propagate_chunked(rhs, (0, YEAR), y0, t_eval, str(tmp_path), chunk_size=7)
+    reference = solve_orbits(rhs, (0, YEAR), y0, t_eval)
+    np.testing.assert_allclose(store.y, reference.y, rtol=1e-8, atol=1e3)
+
+
+def test_t_eval_outside_t_span_rejected(tmp_path, system):
+    rhs, y0 = system
+    with pytest.raises(ValueError):
+        propagate_chunked(rhs, (0, YEAR), y0, np.linspace(0, 2 * YEAR, 5), str(tmp_path))
+
+
+def test_resume_checks_run(tmp_path, system):
+    rhs, y0 = system
+    t_eval = np.linspace(0, YEAR, 20)
+    first = np.array(propagate_chunked(rhs, (0, YEAR), y0, t_eval, str(tmp_path), chunk_size=5).y)
+
+    # Тот же расчет продолжается (уже завершен), другой - отвергается
+    np.testing.assert_array_equal(propagate_chunked(rhs, (0, YEAR), y0, t_eval, str(tmp_path)).y, first)
+    with pytest.raises(ValueError):
+        propagate_chunked(rhs, (0, YEAR), y0 * 1.001, t_eval, str(tmp_path))
+    with pytest.raises(ValueError):
+        propagate_chunked(rhs, (0, YEAR), y0, 0.9 * t_eval, str(tmp_path))
+    propagate_chunked(rhs, (0, YEAR), y0 * 1.001, t_eval, str(tmp_path), resume=False)